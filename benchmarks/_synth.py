@@ -0,0 +1,19 @@
+# _synth.py - synthetic attendance logs shared by the benchmarks
+# Import after the benchmark has chdir'ed to its temp dir (storage.py creates ./data on import).
+import pandas as pd
+from storage import CSV_COLUMNS
+
+def slot_key(n):
+    return f"{n:032x}"
+
+def write_log(path, rows, per_slot=2500, students=5000, first_slot=0, block=250_000):
+    # `rows` rows in attendance.csv layout: lectures of per_slot submissions (keys slot_key(first_slot),
+    # slot_key(first_slot + 1), ...) from a pool of `students` devices, written block by block
+    for start in range(0, rows, block):
+        i = pd.RangeIndex(start, min(start + block, rows)).to_series()
+        s = (i % students).astype(str)
+        pd.DataFrame({
+            "timestamp": "2024-03-01T09:" + (i % 60).astype(str).str.zfill(2) + ":00Z",
+            "slot_key": (first_slot + i // per_slot).map("{:032x}".format),
+            "name": "Student " + s, "email": "s" + s + "@uni.edu", "cid": "cid-" + s.str.zfill(5),
+        }, columns=CSV_COLUMNS).to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
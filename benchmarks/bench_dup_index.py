@@ -0,0 +1,34 @@
+# bench_dup_index.py - duplicate check cost: full read_csv scan vs DupIndex
+# usage: python benchmarks/bench_dup_index.py [--sizes 10000,100000,1000000]
+import sys, os, time, tempfile, argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(tempfile.mkdtemp())  # storage.py creates ./data on import
+import pandas as pd
+from storage import DupIndex
+from _synth import write_log
+
+def scan_check(path, slot_key, cid):
+    # the old submit-path check
+    df = pd.read_csv(path)
+    return ((df['slot_key'] == slot_key) & (df.get('cid','') == cid)).any()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--lookups", type=int, default=100000)
+    args = ap.parse_args()
+    print(f"{'rows':>9} {'scan check ms':>14} {'index build s':>14} {'index lookup us':>16}")
+    for n in (int(x) for x in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "attendance.csv"; write_log(path, n, per_slot=300)
+            probe = (f"{(n - 1) // 300:032x}", "cid-missing")
+            t0 = time.perf_counter(); scan_check(path, *probe); scan = time.perf_counter() - t0
+            t0 = time.perf_counter(); idx = DupIndex(path); build = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            for _ in range(args.lookups): probe in idx
+            lookup = (time.perf_counter() - t0) / args.lookups
+            print(f"{n:>9} {scan * 1e3:>14.1f} {build:>14.2f} {lookup * 1e6:>16.3f}")
+
+if __name__ == "__main__":
+    main()
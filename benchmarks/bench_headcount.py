@@ -0,0 +1,50 @@
+# bench_headcount.py - live headcount: in-memory counters against recounting the log on every refresh
+# usage: python benchmarks/bench_headcount.py [--rows 1000000] [--appends 2000] [--backend csv]
+# Seeds a log of --rows rows, then times: seeding the counters (once per process), a headcount
+# refresh from the counters, and the recount a refresh would otherwise need (the counts of
+# every slot, and reading the current slot's rows). Then appends --appends rows from 8 threads
+# and checks the counters against a fresh count.
+import sys, os, time, tempfile, argparse, threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(tempfile.mkdtemp())  # storage.py creates ./data on import
+import storage
+from _synth import write_log
+
+SLOTS = 400
+
+def timed(label, fn, n=1):
+    t0 = time.perf_counter()
+    for _ in range(n): out = fn()
+    ms = (time.perf_counter() - t0) * 1000 / n
+    print(f"{label:<40} {ms:>10.3f}  {out}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--appends", type=int, default=2000)
+    ap.add_argument("--backend", default="csv", choices=["csv", "sqlite", "sharded"])
+    args = ap.parse_args()
+    write_log(storage.CSV_PATH, args.rows, args.rows // SLOTS)
+    s = storage.get_storage(args.backend)
+    cur = f"{SLOTS - 1:032x}"; recent = [f"{SLOTS - 1 - i:032x}" for i in range(5)]
+    print(f"{args.rows} rows in {SLOTS} slots, {args.backend} backend")
+    print(f"{'operation':<40} {'ms':>10}  result")
+    timed("seed counters (first headcounts call)", lambda: s.headcounts(recent)[cur])
+    timed("headcounts, 5 recent slots", lambda: s.headcounts(recent)[cur], n=1000)
+    timed("counts() of every slot", lambda: int(s.counts()[cur]), n=3)
+    timed("read_df(current slot)", lambda: len(s.read_df(cur)), n=3)
+
+    def run(t):
+        for j in range(args.appends // 8):
+            s.append({"timestamp": "2024-03-01T10:00:00Z", "slot_key": cur, "name": "x", "email": "x@x",
+                      "cid": f"new-{t}-{j}"})
+    ts = [threading.Thread(target=run, args=(t,)) for t in range(8)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    live, fresh = s.headcounts([cur])[cur], int(s.counts()[cur])
+    print(f"after {args.appends // 8 * 8} appends: counters {live}, recount {fresh} ({'ok' if live == fresh else 'FAIL'})")
+    sys.exit(0 if live == fresh else 1)
+
+if __name__ == "__main__":
+    main()
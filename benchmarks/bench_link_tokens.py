@@ -0,0 +1,29 @@
+# bench_link_tokens.py - QR version, image size and encode time: ?key=&s= links vs compact ?t= tokens
+# usage: python benchmarks/bench_link_tokens.py [--base-url URL] [--secret S] [--runs 50]
+import sys, os, time, uuid, tempfile, argparse, urllib.parse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(tempfile.mkdtemp())  # storage.py creates ./data on import
+from qr import build_qr, _render
+from slots import link_token
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base-url", default="https://qr-attendance.streamlit.app")
+    ap.add_argument("--secret", default="a-typical-24-char-secret")
+    ap.add_argument("--runs", type=int, default=50)
+    args = ap.parse_args()
+    key = uuid.uuid4().hex
+    links = [("key=&s= (before)", f"{args.base_url}/?{urllib.parse.urlencode({'key': key, 's': args.secret})}"),
+             ("t= (compact)", f"{args.base_url}/?{urllib.parse.urlencode({'t': link_token(args.secret, key)})}")]
+    print(f"{'link':>18} {'chars':>6} {'version':>8} {'modules':>8} {'png bytes':>10} {'png ms':>8} {'svg bytes':>10}")
+    for label, link in links:
+        q = build_qr(link); modules = q.modules_count
+        t0 = time.perf_counter()
+        for _ in range(args.runs): png = _render(link, "png", 10, 4, "M")
+        ms = (time.perf_counter() - t0) / args.runs * 1e3
+        svg = _render(link, "svg", 10, 4, "M")
+        print(f"{label:>18} {len(link):>6} {q.version:>8} {modules:>8} {len(png):>10} {ms:>8.2f} {len(svg):>10}")
+
+if __name__ == "__main__":
+    main()
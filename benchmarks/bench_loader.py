@@ -0,0 +1,36 @@
+# bench_loader.py - loading the attendance log: untyped pd.read_csv vs the typed, column-pruned load_csv
+# usage: python benchmarks/bench_loader.py [--rows 1000000] [--slots 200]
+import sys, os, time, tempfile, argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(tempfile.mkdtemp())  # storage.py creates ./data on import
+import pandas as pd
+import storage
+from storage import load_csv, parse_timestamps
+from _synth import write_log
+
+def run(label, fn):
+    t0 = time.perf_counter(); df = fn(); s = time.perf_counter() - t0
+    mb = df.memory_usage(deep=True).sum() / 2**20
+    print(f"{label:<44} {s:>7.2f} {mb:>9.1f}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--slots", type=int, default=200)
+    args = ap.parse_args()
+    path = storage.CSV_PATH
+    write_log(path, args.rows, per_slot=max(1, args.rows // args.slots))
+    print(f"{args.rows} rows, {args.slots} slots, {path.stat().st_size / 2**20:.0f} MiB on disk")
+    print(f"{'load':<44} {'s':>7} {'MiB (deep)':>9}")
+    run("pd.read_csv(path)  (previous read_df)", lambda: pd.read_csv(path))
+    run("read_csv(dtype=str) + parse_timestamps", lambda: parse_timestamps(pd.read_csv(path, dtype=str)))
+    run("load_csv(engine='c')", lambda: load_csv(path, engine="c"))
+    run(f"load_csv(engine='pyarrow'{'' if storage.csv_engine('pyarrow') == 'pyarrow' else ', not installed -> c'})",
+        lambda: load_csv(path, engine="pyarrow"))
+    run("load_csv(usecols=['slot_key', 'cid'])", lambda: load_csv(path, usecols=["slot_key", "cid"]))
+    t0 = time.perf_counter(); storage.DupIndex(path); s = time.perf_counter() - t0
+    print(f"{'DupIndex(path).rebuild()':<44} {s:>7.2f}")
+
+if __name__ == "__main__":
+    main()
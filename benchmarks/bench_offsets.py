@@ -0,0 +1,40 @@
+# bench_offsets.py - per-slot reads on a large attendance.csv: chunked scan vs the byte-offset sidecar index
+# usage: python benchmarks/bench_offsets.py [--rows 1000000] [--per-slot 2500] [--appends 300]
+import sys, os, time, tempfile, argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(tempfile.mkdtemp())  # storage.py creates ./data on import
+import pandas as pd
+import storage
+from storage import GroupCommitWriter, OffsetIndex, iter_csv_chunks
+from _synth import write_log
+
+def timed(fn):
+    t0 = time.perf_counter(); out = fn(); return (time.perf_counter() - t0) * 1000, out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--per-slot", type=int, default=2500)
+    ap.add_argument("--appends", type=int, default=300)
+    args = ap.parse_args()
+    path = storage.CSV_PATH; write_log(path, args.rows, args.per_slot)
+    slots = args.rows // args.per_slot
+    print(f"{args.rows} rows, {slots} slots, {path.stat().st_size / 2**20:.0f} MiB")
+    ms, _ = timed(lambda: OffsetIndex(path).ranges("")); print(f"{'index build, no sidecar':<40} {ms:>9.1f} ms")
+    ms, _ = timed(lambda: OffsetIndex(path).ranges("")); print(f"{'index load from sidecar':<40} {ms:>9.1f} ms")
+    idx = OffsetIndex(path); idx.ranges("")
+    print(f"{'read one slot (ms)':<28} {'chunked scan':>12} {'offset index':>12}")
+    for label, n in (("first slot", 0), ("middle slot", slots // 2), ("last slot", slots - 1)):
+        key = f"{n:032x}"
+        scan_ms, a = timed(lambda: pd.concat(list(iter_csv_chunks(path, slot_key=key))))
+        seek_ms, b = timed(lambda: idx.read_slot(key))
+        assert len(a) == len(b) == args.per_slot
+        print(f"{label:<28} {scan_ms:>12.1f} {seek_ms:>12.1f}")
+    row = {"timestamp": "2024-03-02T09:00:00Z", "slot_key": f"{slots:032x}", "name": "x", "email": "x", "cid": ""}
+    for label, w in (("append, no index", GroupCommitWriter(path)), ("append, maintaining index", GroupCommitWriter(path, on_commit=idx.add))):
+        ms, _ = timed(lambda: [w.append(row) for _ in range(args.appends)])
+        print(f"{label:<40} {ms / args.appends * 1000:>9.0f} us/row (fsync per row)")
+
+if __name__ == "__main__":
+    main()
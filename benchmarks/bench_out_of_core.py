@@ -0,0 +1,74 @@
+# bench_out_of_core.py - OUT_OF_CORE mode on a synthetic multi-million-row log, checked against a memory cap
+# usage: python benchmarks/bench_out_of_core.py [--rows 5000000] [--cap-mb 256] [--full]
+# Each operation runs in a fresh subprocess; "peak MB" is peak RSS (VmHWM) growth over the RSS
+# after imports. Exits 1 if any streamed operation goes over --cap-mb. "export_csv" streams the
+# export into a temp file; "export_bytes" is what the admin page's "Prepare CSV" does
+# (core.export_csv_bytes): st.download_button needs the whole file as bytes, so that one grows
+# with the log and is reported, not capped. --full also times the in-memory read_df for comparison (not capped).
+# Linux only (/proc/self/clear_refs).
+import sys, os, gc, time, tempfile, argparse, subprocess
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(os.environ.get("BENCH_DIR") or tempfile.mkdtemp())  # storage.py creates ./data on import
+if not os.path.exists(".streamlit"):
+    os.mkdir(".streamlit")
+    with open(".streamlit/secrets.toml", "w") as f: f.write('QR_SECRET = "bench"\n')  # core.py reads secrets on import
+import storage
+from _synth import write_log
+
+STUDENTS, PER_SLOT = 5000, 2500
+
+def vm_kib(field):
+    with open("/proc/self/status") as f:
+        return next(int(l.split()[1]) for l in f if l.startswith(field + ":"))
+
+def run_op(op, rows):
+    storage.OUT_OF_CORE = op != "full"
+    import core
+    n = rows // PER_SLOT // 2; mid = f"{n:032x}"; seen = f"cid-{n * PER_SLOT % STUDENTS:05d}"  # a cid in that slot
+    gc.collect()
+    with open("/proc/self/clear_refs", "w") as f: f.write("5")  # reset VmHWM to the current RSS
+    base = vm_kib("VmRSS"); t0 = time.perf_counter()
+    if op == "counts":
+        out = f"{len(storage.CsvStorage().counts())} slots"
+    elif op == "dedupe":
+        idx = storage.SlotDupIndex(storage.CSV_PATH)
+        out = f"duplicate found={(mid, seen) in idx} new cid reserved={idx.reserve((mid, 'cid-new'))}"
+    elif op == "slot_rows":
+        out = f"{len(storage.CsvStorage().read_df(mid))} rows"
+    elif op == "export_csv":
+        with core.spooled(core.iter_export_csv(storage.CsvStorage().iter_chunks())) as f:
+            out = f"{os.fstat(f.fileno()).st_size / 2**20:.0f} MiB"
+    elif op == "export_bytes":
+        out = f"{len(core.export_csv_bytes()) / 2**20:.0f} MiB held as bytes"
+    else:
+        out = f"{len(storage.read_df())} rows"
+    secs = time.perf_counter() - t0
+    print(secs, (vm_kib("VmHWM") - base) / 1024, out)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=5_000_000)
+    ap.add_argument("--cap-mb", type=float, default=256)
+    ap.add_argument("--full", action="store_true", help="also run the in-memory read_df")
+    ap.add_argument("--op", help=argparse.SUPPRESS)  # internal
+    args = ap.parse_args()
+    if args.op:
+        return run_op(args.op, args.rows)
+    t0 = time.perf_counter(); write_log(storage.CSV_PATH, args.rows, PER_SLOT, STUDENTS)
+    print(f"{args.rows} rows, {storage.CSV_PATH.stat().st_size / 2**20:.0f} MiB written in {time.perf_counter() - t0:.0f} s;"
+          f" CHUNK_ROWS={storage.CHUNK_ROWS}, cap {args.cap_mb:.0f} MB")
+    print(f"{'operation':<12} {'seconds':>8} {'peak MB':>8} {'':>5}  result", flush=True)
+    failed = False
+    uncapped = ("export_bytes", "full")
+    for op in ("counts", "dedupe", "slot_rows", "export_csv", "export_bytes") + (("full",) if args.full else ()):
+        res = subprocess.run([sys.executable, __file__, "--op", op, "--rows", str(args.rows)], capture_output=True,
+                             text=True, check=True, env={**os.environ, "BENCH_DIR": os.getcwd()}).stdout.split(maxsplit=2)
+        secs, peak = float(res[0]), float(res[1])
+        verdict = "-" if op in uncapped else ("ok" if peak <= args.cap_mb else "OVER")
+        failed |= verdict == "OVER"
+        print(f"{op:<12} {secs:>8.1f} {peak:>8.1f} {verdict:>5}  {res[2].strip()}", flush=True)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# bench_qr_modes.py - encode time, QR version and payload size per rendering mode
+# usage: python benchmarks/bench_qr_modes.py [--base-url URL] [--secret S] [--runs 50]
+import sys, time, uuid, argparse, urllib.parse
+from io import BytesIO
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import qrcode
+from qr import build_qr, _render
+
+MODES = [  # (label, fmt, box_size, border, error)
+    ("png 10/4 M (default)", "png", 10, 4, "M"),
+    ("png 6/2 M", "png", 6, 2, "M"),
+    ("png 4/2 L", "png", 4, 2, "L"),
+    ("svg 4 M", "svg", 10, 4, "M"),
+    ("svg 2 L", "svg", 10, 2, "L"),
+]
+
+def legacy(link):
+    # make_qr_bytes before render modes: qrcode.make + PIL PNG encode
+    b = BytesIO(); qrcode.make(link).save(b, format="PNG"); return b.getvalue()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base-url", default="https://qr-attendance.streamlit.app")
+    ap.add_argument("--secret", default="a-typical-24-char-secret")
+    ap.add_argument("--runs", type=int, default=50)
+    args = ap.parse_args()
+    link = f"{args.base_url}/?{urllib.parse.urlencode({'key': uuid.uuid4().hex, 's': args.secret})}"
+    print(f"link: {link} ({len(link)} chars)")
+    print(f"{'mode':>22} {'version':>8} {'encode ms':>10} {'bytes':>8}")
+    t0 = time.perf_counter()
+    for _ in range(args.runs): data = legacy(link)
+    print(f"{'qrcode.make (before)':>22} {build_qr(link).version:>8} {(time.perf_counter() - t0) / args.runs * 1e3:>10.2f} {len(data):>8}")
+    for label, fmt, box, border, err in MODES:
+        t0 = time.perf_counter()
+        for _ in range(args.runs): data = _render(link, fmt, box, border, err)
+        ms = (time.perf_counter() - t0) / args.runs * 1e3
+        print(f"{label:>22} {build_qr(link, err, box, border).version:>8} {ms:>10.2f} {len(data):>8}")
+
+if __name__ == "__main__":
+    main()
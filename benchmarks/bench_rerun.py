@@ -0,0 +1,53 @@
+# bench_rerun.py - wall time of a full script rerun per page, driven by streamlit.testing.AppTest
+# usage: python benchmarks/bench_rerun.py [--runs 20] [--baseline OLD_APP.py]
+#   --baseline times another script the same way, e.g. the single-page app from before the split:
+#   git show $(git log --format=%h -1 --diff-filter=A -- pages)~1:app2.py > /tmp/single_page.py
+#   python benchmarks/bench_rerun.py --baseline /tmp/single_page.py
+import sys, os, time, tempfile, argparse
+from pathlib import Path
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(tempfile.mkdtemp())  # the app writes ./data
+os.mkdir(".streamlit")
+with open(".streamlit/secrets.toml", "w") as f:
+    f.write('QR_SECRET = "bench-secret"\nADMIN_PASSWORD = "bench"\nBASE_URL = "https://example.edu"\n')
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+import qr
+
+if not hasattr(st, "experimental_get_query_params"):  # removed in newer Streamlit releases
+    st.experimental_get_query_params = lambda: {k: st.query_params.get_all(k) for k in st.query_params}
+
+def rerun_ms(script, runs, query=None):
+    at = AppTest.from_file(str(script), default_timeout=60)
+    for k, v in (query or {}).items(): at.query_params[k] = v
+    at.run()  # warm-up: imports, slot file, first render
+    t0 = time.perf_counter()
+    for _ in range(runs): at.run()
+    return (time.perf_counter() - t0) / runs * 1e3
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=20)
+    ap.add_argument("--baseline", help="another page script to time for comparison")
+    args = ap.parse_args()
+    import core
+    from slots import link_token
+    scanned = {"t": link_token(core.QR_SECRET, core.current_slot()[0]), "cid": "bench-device-0001"}
+    rows = []
+    if args.baseline:
+        size = qr.QR_CACHE_SIZE; qr.QR_CACHE_SIZE = 0; qr._cache.clear()
+        rows.append(("baseline, QR rendered", rerun_ms(args.baseline, args.runs)))
+        qr.QR_CACHE_SIZE = size
+        rows.append(("baseline, QR cached", rerun_ms(args.baseline, args.runs)))
+    rows.append(("student, scanned link", rerun_ms(ROOT / "app2.py", args.runs, scanned)))
+    rows.append(("student, no link", rerun_ms(ROOT / "app2.py", args.runs)))
+    size = qr.QR_CACHE_SIZE; qr.QR_CACHE_SIZE = 0; qr._cache.clear()
+    rows.append(("projector, QR rendered", rerun_ms(ROOT / "pages" / "1_Projector.py", args.runs)))
+    qr.QR_CACHE_SIZE = size
+    rows.append(("projector, QR cached", rerun_ms(ROOT / "pages" / "1_Projector.py", args.runs)))
+    rows.append(("admin", rerun_ms(ROOT / "pages" / "2_Admin.py", args.runs)))
+    for label, ms in rows: print(f"{label:>24} {ms:8.1f} ms/rerun")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# bench_shards.py - per-slot work on one attendance.csv vs per-slot shards (data/slots/<slot_key>.csv)
+# usage: python benchmarks/bench_shards.py [--rows 1000000] [--per-slot 2500]
+import sys, os, time, tempfile, argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(tempfile.mkdtemp())  # storage.py creates ./data on import
+import storage
+from _synth import write_log
+
+def timed(fn):
+    t0 = time.perf_counter(); fn(); return (time.perf_counter() - t0) * 1000
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--per-slot", type=int, default=2500)
+    args = ap.parse_args()
+    write_log(storage.CSV_PATH, args.rows, args.per_slot)
+    slot = f"{args.rows // args.per_slot // 2:032x}"
+    storage.OUT_OF_CORE = True  # the single-file path that does not load the whole log
+    single = storage.CsvStorage()
+    t0 = time.perf_counter(); sharded = storage.ShardedStorage(); split_s = time.perf_counter() - t0
+    print(f"{args.rows} rows, {args.rows // args.per_slot} slots; one-off split into shards {split_s:.1f} s")
+    print(f"{'per-slot operation (ms)':<34} {'attendance.csv':>15} {'shard':>8}")
+    for label, fn in (("first duplicate check", lambda s: s.has_submission(slot, "cid-00001")),
+                      ("repeat duplicate check", lambda s: s.has_submission(slot, "cid-00002")),
+                      ("read_df(slot_key)", lambda s: s.read_df(slot)),
+                      ("export chunks for the slot", lambda s: sum(len(c) for c in s.iter_chunks(slot_key=slot))),
+                      ("counts per slot", lambda s: s.counts())):
+        print(f"{label:<34} {timed(lambda: fn(single)):>15.1f} {timed(lambda: fn(sharded)):>8.1f}")
+
+if __name__ == "__main__":
+    main()
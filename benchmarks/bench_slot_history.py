@@ -0,0 +1,59 @@
+# bench_slot_history.py - late submissions across a slot rotation, and the cost of checking a scanned link
+# usage: python benchmarks/bench_slot_history.py [--lookups 100000]
+# Rotates the slot with a PIN set, then checks that a link (and PIN) from the replaced slot is
+# accepted within SLOT_GRACE and refused after it. Then times link_slot() for the current slot,
+# a slot in the history and an unknown token against a linear token_slot() scan of the same keys.
+import sys, os, time, tempfile, argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(tempfile.mkdtemp())  # storage.py creates ./data on import
+os.mkdir(".streamlit")
+with open(".streamlit/secrets.toml", "w") as f: f.write('QR_SECRET = "bench"\n')  # core.py reads secrets on import
+import slots, core
+
+def rotate():
+    # expire the current slot as if its TTL had run out just now
+    slots.update_slot_data(lambda d: {**d, "created": int(time.time()) - core.SLOT_TTL - 1})
+    slots._cache._checked = 0
+    return core.current_slot()[0]
+
+def check(label, got, want):
+    print(f"{label:<52} {str(got):<10} {'ok' if got == want else 'FAIL'}")
+    return got == want
+
+def timeit(fn, n):
+    t0 = time.perf_counter()
+    for _ in range(n): fn()
+    return (time.perf_counter() - t0) / n * 1e6
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lookups", type=int, default=100_000)
+    args = ap.parse_args()
+    old = core.current_slot()[0]; slots.set_current_pin("1234", old)
+    new = rotate(); slots.set_current_pin("9999", new)
+    link = {"t": [slots.link_token(core.QR_SECRET, old)]}
+    ok = check("old link accepted within grace", core.link_slot(link) == old, True)
+    ok &= check("old slot keeps its PIN", slots.get_current_pin(old), "1234")
+    ok &= check("current slot has the new PIN", slots.get_current_pin(new), "9999")
+    ok &= check("old key/s link accepted within grace", core.link_slot({"key": [old], "s": [core.QR_SECRET]}) == old, True)
+    grace, core.SLOT_GRACE = core.SLOT_GRACE, 0
+    slots._history._ring[old]["until"] -= 1  # replaced a second ago, grace 0
+    ok &= check("old link refused after grace", core.link_slot(link), None)
+    core.SLOT_GRACE = grace
+    for _ in range(slots.SLOT_HISTORY + 2): rotate()
+    ok &= check(f"slot older than SLOT_HISTORY={slots.SLOT_HISTORY} forgotten", slots._history.get(old), None)
+
+    cur = core.current_slot()[0]
+    keys = [cur] + [k for k in reversed(slots.recent_slot_keys()) if k != cur]; hist = keys[-1]
+    core.SLOT_GRACE = 10 ** 9  # every key in the ring counts as recent for the timing
+    print(f"\n{len(keys)} known slot keys, {args.lookups} lookups")
+    print(f"{'lookup':<40} {'us/call':>8}")
+    for label, tok in (("current slot", cur), ("oldest slot in history", hist), ("unknown token", None)):
+        t = slots.link_token(core.QR_SECRET, tok) if tok else "AAAAAAAAAAAA"
+        print(f"{'link_slot, ' + label:<40} {timeit(lambda: core.link_slot({'t': [t]}), args.lookups):>8.2f}")
+        print(f"{'token_slot scan, ' + label:<40} {timeit(lambda: slots.token_slot(t, core.QR_SECRET, keys), args.lookups):>8.2f}")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# bench_slot_keys.py - cost of resolving + validating a slot key per rerun: slot file vs HMAC-derived
+# usage: python benchmarks/bench_slot_keys.py [--calls 20000] [--threads 50]
+import sys, os, time, tempfile, threading, argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(tempfile.mkdtemp())  # storage.py creates ./data on import
+import slots
+from slots import ensure_current_slot, read_json_safe, derived_slot, check_derived_key, SLOT_FILE
+
+SECRET, TTL = "bench-secret", 600
+
+def file_uncached():
+    # what every rerun did before the slot cache: open + parse the slot file
+    d = read_json_safe(SLOT_FILE); return d["slot_key"] == d["slot_key"]
+
+def file_cached():
+    key, _ = ensure_current_slot(TTL); return key == key
+
+def hmac_derived(grace):
+    key, _ = derived_slot(SECRET, TTL); return check_derived_key(key, SECRET, TTL, grace)
+
+def timed(fn, calls, threads):
+    per = max(1, calls // threads)
+    def worker():
+        for _ in range(per): fn()
+    ts = [threading.Thread(target=worker) for _ in range(threads)]
+    t0 = time.perf_counter()
+    for t in ts: t.start()
+    for t in ts: t.join()
+    return (time.perf_counter() - t0) / (per * threads) * 1e6
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=20000)
+    ap.add_argument("--threads", type=int, default=50)
+    args = ap.parse_args()
+    ensure_current_slot(TTL)
+    cases = [("file, open+parse", file_uncached), ("file, cached", file_cached),
+             ("hmac, grace 0", lambda: hmac_derived(0)), ("hmac, grace 2", lambda: hmac_derived(2))]
+    print(f"{'path':>18} {'1 thread us/call':>17} {f'{args.threads} threads us/call':>19}")
+    for name, fn in cases:
+        print(f"{name:>18} {timed(fn, args.calls, 1):>17.2f} {timed(fn, args.calls, args.threads):>19.2f}")
+    # rotations under contention: every caller sees an expired slot at once
+    slots.atomic_write_json(SLOT_FILE, {"slot_key": "old", "created": 0}); slots._cache.put({"slot_key": "old", "created": 0})
+    keys = set(); lock = threading.Lock()
+    def rotate():
+        k, _ = ensure_current_slot(TTL)
+        with lock: keys.add(k)
+    ts = [threading.Thread(target=rotate) for _ in range(args.threads)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    print(f"distinct keys issued at one expiry with {args.threads} threads: file={len(keys)} hmac=1")
+
+if __name__ == "__main__":
+    main()
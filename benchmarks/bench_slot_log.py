@@ -0,0 +1,60 @@
+# bench_slot_log.py - per-lecture report from the slot log: range queries and headcounts without reading rows
+# usage: python benchmarks/bench_slot_log.py [--slots 50000] [--rows 1000000]
+# Writes a slot log of --slots past 10-minute slots (PIN on every other one) plus the current one,
+# and an attendance log of --rows rows over the newest 400 past slots. Then times loading the log,
+# a one-month lecture query (bisect) against filtering every record, and per-slot counts from the
+# offset index against the streamed count. Finally checks that final headcounts are logged once
+# and survive an archive.
+import sys, os, json, time, tempfile, argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(tempfile.mkdtemp())  # storage.py creates ./data on import
+os.mkdir(".streamlit")
+with open(".streamlit/secrets.toml", "w") as f: f.write('QR_SECRET = "bench"\n')  # core.py reads secrets on import
+import storage, slots, core
+from _synth import write_log
+
+TTL = 600
+
+def write_slot_log(n, t0):
+    with open(slots.SLOT_LOG, "w", encoding="utf-8") as f:
+        for i in range(n + 1):  # the last one is the current slot, with no rows yet
+            created = t0 + i * TTL
+            f.write(json.dumps({"slot_key": f"{i:032x}", "created": created, "expired": created}) + "\n")
+            if i % 2: f.write(json.dumps({"slot_key": f"{i:032x}", "pin": "1234", "pin_set_at": created + 30}) + "\n")
+
+def timed(label, fn):
+    t0 = time.perf_counter(); out = fn(); ms = (time.perf_counter() - t0) * 1000
+    print(f"{label:<48} {ms:>9.2f}  {out}")
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--slots", type=int, default=50_000)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    args = ap.parse_args()
+    t0 = int(time.time()) - (args.slots + 1) * TTL
+    write_slot_log(args.slots, t0); write_log(storage.CSV_PATH, args.rows, args.rows // 400, first_slot=args.slots - 400)
+    print(f"{args.slots} slots in the log ({slots.SLOT_LOG.stat().st_size / 2**20:.1f} MiB), {args.rows} attendance rows")
+    print(f"{'operation':<48} {'ms':>9}  result")
+    log = slots.SlotLog(slots.SLOT_LOG)
+    timed("load slot log", lambda: f"{len(log.between())} slots")
+    month = (t0 + (args.slots - 30 * 144) * TTL, t0 + args.slots * TTL)  # the last 30 days (144 slots a day)
+    timed("slots in the last 30 days, bisect", lambda: f"{len(log.between(*month))} slots")
+    timed("slots in the last 30 days, filter all", lambda: f"{sum(month[0] <= r['created'] < month[1] for r in log.between())} slots")
+    s = storage.CsvStorage()
+    timed("counts per slot, offset index (no sidecar: scan)", lambda: f"{len(s.counts())} slots")
+    timed("counts per slot, offset index (in memory)", lambda: f"{len(s.counts())} slots")
+    timed("counts per slot, offset index (from sidecar)", lambda: f"{len(storage.OffsetIndex().counts())} slots")
+    timed("counts per slot, streamed rows", lambda: f"{len(storage.Storage.counts(s))} slots")
+    timed("core.store() (app startup, duplicate index)", lambda: type(core.store()).__name__)
+    timed("lecture_report, 30 days (loads the slot log)", lambda: f"{len(core.lecture_report(*month))} rows")
+    timed("lecture_report again (counts from the log)", lambda: f"{len(core.lecture_report(*month))} rows")
+    ok = core.store().archive()[0]  # the app's store: logs the archived rows per slot
+    rep = core.lecture_report(*month)
+    kept = int(rep["headcount"].sum())
+    print(f"after archive: {kept} check-ins still reported ({'ok' if ok and kept == args.rows else 'FAIL'})")
+    sys.exit(0 if ok and kept == args.rows else 1)
+
+if __name__ == "__main__":
+    main()
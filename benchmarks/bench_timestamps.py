@@ -0,0 +1,37 @@
+# bench_timestamps.py - export timestamp formatting: per-row apply vs parse-once + vectorized format
+# usage: python benchmarks/bench_timestamps.py [--sizes 100000,1000000] [--tz UTC]
+import sys, os, time, tempfile, argparse
+from datetime import datetime
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(tempfile.mkdtemp())  # storage.py creates ./data on import
+os.mkdir(".streamlit")
+with open(".streamlit/secrets.toml", "w") as f: f.write('QR_SECRET = "bench"\n')  # core.py reads secrets on import
+import pandas as pd
+import core
+from storage import parse_timestamps
+
+def now_local_str(iso_z):
+    # the per-row formatter df_for_export used before
+    try:
+        dt = datetime.fromisoformat(str(iso_z).replace("Z",""))
+        return dt.strftime("%Y-%m-%d %H:%M:%S")
+    except Exception:
+        return str(iso_z)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="100000,1000000")
+    ap.add_argument("--tz", default="UTC", help="DISPLAY_TZ for the vectorized path")
+    args = ap.parse_args()
+    core.DISPLAY_TZ = args.tz
+    print(f"{'rows':>9} {'apply s':>9} {'parse s (read)':>15} {'format s (export)':>18}")
+    for n in (int(x) for x in args.sizes.split(",")):
+        raw = pd.Series([f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T{i % 24:02d}:{i % 60:02d}:{i % 59:02d}Z" for i in range(n)])
+        t0 = time.perf_counter(); raw.apply(now_local_str); apply_s = time.perf_counter() - t0
+        t0 = time.perf_counter(); ts = parse_timestamps(pd.DataFrame({"timestamp": raw}))["timestamp"]; parse_s = time.perf_counter() - t0
+        t0 = time.perf_counter(); core.format_timestamps(ts); fmt_s = time.perf_counter() - t0
+        print(f"{n:>9} {apply_s:>9.2f} {parse_s:>15.2f} {fmt_s:>18.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# bench_xlsx.py - XLSX export time and peak memory: pd.ExcelWriter vs write-only streaming
+# usage: python benchmarks/bench_xlsx.py [--sizes 10000,100000,500000] [--legacy-max 100000]
+# Each case runs in a fresh subprocess; "extra MB" is peak RSS (VmHWM) growth over the
+# RSS with the input frame loaded. Linux only: the peak is reset through /proc/self/clear_refs.
+import sys, os, gc, time, tempfile, argparse, subprocess
+from io import BytesIO
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(tempfile.mkdtemp())  # storage.py creates ./data on import
+os.mkdir(".streamlit")
+with open(".streamlit/secrets.toml", "w") as f: f.write('QR_SECRET = "bench"\n')  # core.py reads secrets on import
+import pandas as pd
+from core import df_for_export, write_xlsx
+from storage import parse_timestamps, CSV_COLUMNS
+
+def frame(n, per_slot=300):
+    return parse_timestamps(pd.DataFrame({
+        "timestamp": [f"2024-01-{1 + i % 28:02d}T09:{i % 60:02d}:00Z" for i in range(n)],
+        "slot_key": [f"{i // per_slot:032x}" for i in range(n)],
+        "name": [f"student {i}" for i in range(n)], "email": [f"s{i}@example.edu" for i in range(n)],
+        "cid": [f"cid-{i:08d}" for i in range(n)]}, columns=CSV_COLUMNS))
+
+def legacy(df, path):
+    # df_to_xlsx_bytes before streaming: full cell model via pd.ExcelWriter
+    bio = BytesIO()
+    with pd.ExcelWriter(bio, engine="openpyxl") as writer:
+        df_for_export(df).to_excel(writer, index=False, sheet_name="attendance")
+    Path(path).write_bytes(bio.getvalue())
+
+def vm_kib(field):
+    with open("/proc/self/status") as f:
+        return next(int(l.split()[1]) for l in f if l.startswith(field + ":"))
+
+def run_case(mode, n, chunk):
+    df = frame(n); path = Path(tempfile.mkdtemp()) / "out.xlsx"
+    chunks = (df.iloc[i:i + chunk] for i in range(0, n, chunk))
+    gc.collect()
+    with open("/proc/self/clear_refs", "w") as f: f.write("5")  # reset VmHWM to the current RSS
+    base = vm_kib("VmRSS")
+    t0 = time.perf_counter()
+    if mode == "legacy": legacy(df, path)
+    else: write_xlsx(chunks, path, per_slot=(mode == "per_slot"))
+    secs = time.perf_counter() - t0
+    print(secs, (vm_kib("VmHWM") - base) / 1024)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000,500000")
+    ap.add_argument("--chunk", type=int, default=50_000)
+    ap.add_argument("--legacy-max", type=int, default=100_000, help="skip the ExcelWriter path above this many rows")
+    ap.add_argument("--case", nargs=2, help=argparse.SUPPRESS)  # internal: mode rows
+    args = ap.parse_args()
+    if args.case:
+        return run_case(args.case[0], int(args.case[1]), args.chunk)
+    print(f"{'rows':>8} {'mode':>22} {'seconds':>8} {'extra MB':>9}", flush=True)
+    for n in (int(x) for x in args.sizes.split(",")):
+        for mode, label in (("legacy", "ExcelWriter (before)"), ("sheet", "write-only, 1 sheet"), ("per_slot", "write-only, per slot")):
+            if mode == "legacy" and n > args.legacy_max: continue
+            out = subprocess.run([sys.executable, __file__, "--case", mode, str(n), "--chunk", str(args.chunk)],
+                                 capture_output=True, text=True, check=True).stdout.split()
+            print(f"{n:>8} {label:>22} {float(out[0]):>8.2f} {float(out[1]):>9.1f}", flush=True)
+
+if __name__ == "__main__":
+    main()
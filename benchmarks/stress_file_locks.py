@@ -0,0 +1,115 @@
+# stress_file_locks.py - several processes appending through one storage backend while another archives it
+# usage: python benchmarks/stress_file_locks.py [--backend csv|sqlite|sharded|all] [--procs 4] [--threads 8]
+#        [--rows 2000] [--archive-every 0.05] [--no-compare]
+# Every row carries its writer, sequence number and name length in cid, so the check can tell torn
+# rows (bad field count, mangled quoting, wrong name length), lost rows and duplicated rows apart.
+# The locked run must show zero of each; the unlocked run (file_lock disabled; csv and sharded only,
+# sqlite does its own locking) is for comparison. A slot-file writer and reader run alongside and
+# count unreadable reads of current_slot.json.
+import sys, os, csv, glob, re, time, sqlite3, tempfile, argparse, threading, multiprocessing as mp
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(os.environ.setdefault("BENCH_DIR", tempfile.mkdtemp()))  # storage.py creates ./data on import
+import storage
+
+CID = re.compile(r"p(\d+)-(\d+)-(\d+)")
+
+def setup(locked):
+    if not locked: storage.fcntl = None
+
+def writer(backend, p, threads, rows, locked):
+    setup(locked)
+    s = storage.get_storage(backend); per = rows // threads
+    def run(t):
+        for j in range(t * per, (t + 1) * per):
+            n = 20 + (j * 7919) % 3000  # up to ~3 KB rows, so batches span many pages
+            name = ('a,"b" ' * n)[:n]
+            ok, err = s.append({"timestamp": "2024-01-01T09:00:00Z", "slot_key": "k" * 32,
+                                "name": name, "email": f"p{p}@x", "cid": f"p{p}-{j}-{n}"})
+            if not ok: print("append failed:", err, flush=True)
+    ts = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+
+def archiver(backend, every, stop, locked):
+    setup(locked)
+    s = storage.get_storage(backend)
+    while not stop.is_set():
+        time.sleep(every); s.archive()
+
+def slot_writer(stop, locked):
+    setup(locked)
+    import slots
+    i = 0
+    while not stop.is_set():
+        slots.write_slot_data({"pin": str(i), "filler": "x" * (i % 5000)}); i += 1
+
+def slot_reader(stop, bad, locked):
+    setup(locked)
+    import slots
+    while not stop.is_set():
+        if slots.SLOT_FILE.exists() and slots.read_json_safe(slots.SLOT_FILE) is None: bad.value += 1
+
+def live_rows(backend):
+    # rows still in the backend after the run, as CSV files plus (sqlite) table rows
+    if backend == "csv": return ["data/attendance.csv"], []
+    if backend == "sharded": return sorted(glob.glob("data/slots/*.csv")), []
+    con = sqlite3.connect(storage.SQLITE_PATH)
+    try:
+        return [], [list(r) for r in con.execute("SELECT timestamp, slot_key, name, email, cid FROM attendance")]
+    finally:
+        con.close()
+
+def check(backend, expected):
+    seen = {}; torn = 0
+    live, table = live_rows(backend); files = sorted(glob.glob("data/archive/*.csv")) + live
+    def row(r):
+        nonlocal torn
+        m = CID.fullmatch(r[4]) if len(r) == 5 else None
+        if m is None or len(r[2]) != int(m.group(3)): torn += 1; return
+        seen[r[4]] = seen.get(r[4], 0) + 1
+    for path in files:
+        if not os.path.exists(path): continue
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = csv.reader(f)
+            header = next(rows, None)
+            if header not in (None, storage.CSV_COLUMNS): torn += 1
+            for r in rows: row(r)
+    for r in table: row(r)
+    return torn, expected - len(seen), sum(c - 1 for c in seen.values()), len(files)
+
+def run(args, backend, locked):
+    for p in glob.glob("data/**/*.csv", recursive=True) + glob.glob("data/*.idx") + glob.glob("data/**/*.json", recursive=True) \
+            + glob.glob("data/attendance.db*"): os.unlink(p)
+    ctx = mp.get_context("spawn"); stop = ctx.Event(); bad = ctx.Value("i", 0)
+    side = [ctx.Process(target=archiver, args=(backend, args.archive_every, stop, locked)),
+            ctx.Process(target=slot_writer, args=(stop, locked)), ctx.Process(target=slot_reader, args=(stop, bad, locked))]
+    procs = [ctx.Process(target=writer, args=(backend, p, args.threads, args.rows, locked)) for p in range(args.procs)]
+    t0 = time.perf_counter()
+    for p in side + procs: p.start()
+    for p in procs: p.join()
+    secs = time.perf_counter() - t0; stop.set()
+    for p in side: p.join()
+    total = args.procs * (args.rows // args.threads * args.threads)
+    torn, lost, dup, files = check(backend, total)
+    print(f"{backend:<8} {'locked' if locked else 'unlocked':<9} {total:>7} {total / secs:>9.0f} {files:>6} {torn:>5} {lost:>5} {dup:>5} {bad.value:>11}")
+    return torn + lost + dup + bad.value
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--procs", type=int, default=4)
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--rows", type=int, default=2000, help="rows per process")
+    ap.add_argument("--archive-every", type=float, default=0.05)
+    ap.add_argument("--no-compare", action="store_true", help="skip the unlocked runs")
+    ap.add_argument("--backend", default="all", choices=["csv", "sqlite", "sharded", "all"])
+    args = ap.parse_args()
+    print(f"{'backend':<8} {'mode':<9} {'rows':>7} {'rows/s':>9} {'files':>6} {'torn':>5} {'lost':>5} {'dup':>5} {'slot misses':>11}", flush=True)
+    failures = 0
+    for backend in (["csv", "sqlite", "sharded"] if args.backend == "all" else [args.backend]):
+        failures += run(args, backend, True)
+        if not args.no_compare and backend != "sqlite": run(args, backend, False)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
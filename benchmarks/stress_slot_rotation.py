@@ -0,0 +1,59 @@
+# stress_slot_rotation.py - 200 threads calling ensure_current_slot as the slot expires
+# usage: python benchmarks/stress_slot_rotation.py [--threads 200] [--rounds 20]
+# Each round writes an expired slot (with a PIN), releases all threads at once through a
+# barrier and counts distinct keys returned, slot-file writes and version steps. The
+# compare-and-swap rotation must give one key, one write and version + 1 every round;
+# the previous unlocked rotation is run the same way for comparison.
+import sys, os, time, uuid, tempfile, argparse, threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(tempfile.mkdtemp())  # storage.py creates ./data on import
+import slots
+
+TTL = 600
+
+def legacy_ensure(ttl=TTL):
+    # ensure_current_slot before the compare-and-swap: every rerun that sees expiry rotates
+    now_ts = int(time.time())
+    data = slots._cache.get()
+    if data and isinstance(data, dict):
+        slot = data.get("slot_key"); created = int(data.get("created", 0))
+        if slot and (now_ts - created) <= ttl:
+            return slot, created
+    new_slot = (data.get("next_slot_key") if isinstance(data, dict) else None) or uuid.uuid4().hex
+    slots._write({"slot_key": new_slot, "created": now_ts, "version": data.get("version", 0) if isinstance(data, dict) else 0})
+    return new_slot, now_ts
+
+def round_(fn, threads):
+    slots._write({"slot_key": "old", "created": int(time.time()) - TTL - 1, "pin": "1234", "pin_slot": "old"})
+    v0 = slots.read_slot_data()["version"]
+    writes = [0]; orig = slots._write_locked
+    def counting(data):
+        writes[0] += 1; orig(data)
+    slots._write_locked = counting
+    barrier = threading.Barrier(threads); keys = []
+    def run():
+        barrier.wait(); keys.append(fn(TTL)[0])
+    ts = [threading.Thread(target=run) for _ in range(threads)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    slots._write_locked = orig
+    return len(set(keys)), writes[0], slots.read_slot_data()["version"] - v0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--threads", type=int, default=200)
+    ap.add_argument("--rounds", type=int, default=20)
+    args = ap.parse_args()
+    print(f"{'rotation':<16} {'rounds':>6} {'max keys':>9} {'max writes':>11} {'max version +':>14} {'bad rounds':>11}")
+    failed = False
+    for label, fn in (("compare-and-swap", slots.ensure_current_slot), ("before (legacy)", legacy_ensure)):
+        res = [round_(fn, args.threads) for _ in range(args.rounds)]
+        bad = sum(1 for r in res if r != (1, 1, 1))
+        if fn is slots.ensure_current_slot: failed = bad > 0
+        print(f"{label:<16} {args.rounds:>6} {max(r[0] for r in res):>9} {max(r[1] for r in res):>11}"
+              f" {max(r[2] for r in res):>14} {bad:>11}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# stress_slot_updates.py - PIN sets racing slot rotations on current_slot.json
+# usage: python benchmarks/stress_slot_updates.py [--pin-threads 16] [--rotate-threads 4] [--seconds 3]
+# Rotator threads call ensure_current_slot with ttl=-1 (every call rotates); PIN threads keep
+# setting PINs for the slot they last saw. Every write to the file is recorded in order and
+# checked: versions must step by exactly one ("stale": a write that did not build on the one
+# before it, silently undoing that update), a retired slot key must never come back
+# ("revived"), and every PIN set reported as saved must be in the history ("lost").
+# The previous cache-based write_slot_data is run the same way for comparison.
+import sys, os, time, tempfile, argparse, threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(tempfile.mkdtemp())  # storage.py creates ./data on import
+import slots
+
+def legacy_write(updates):
+    # write_slot_data before the transactional update: merge into the cached copy, then write
+    data = slots.read_slot_data(); data.update(updates)
+    slots._write(data); return True
+
+def run(write, pin_threads, rotate_threads, seconds):
+    slots._write({"slot_key": "start", "created": int(time.time())})
+    history = []; orig = slots._write_locked
+    def recording(data):
+        orig(data); history.append(dict(data))
+    slots._write_locked = recording
+    stop = threading.Event(); saved = []
+    def rotator():
+        while not stop.is_set(): slots.ensure_current_slot(-1)
+    def pinner(t):
+        i = 0
+        while not stop.is_set():
+            key = slots.read_slot_data().get("slot_key"); pin = f"{t}-{i}"; i += 1
+            if write({"pin": pin, "pin_slot": key}): saved.append(pin)
+    ts = [threading.Thread(target=rotator) for _ in range(rotate_threads)]
+    ts += [threading.Thread(target=pinner, args=(t,)) for t in range(pin_threads)]
+    for t in ts: t.start()
+    time.sleep(seconds); stop.set()
+    for t in ts: t.join()
+    slots._write_locked = orig
+    stale = sum(1 for a, b in zip(history, history[1:]) if b["version"] != a["version"] + 1)
+    retired = set(); revived = 0
+    for a, b in zip(history, history[1:]):
+        if b["slot_key"] != a["slot_key"]:
+            retired.add(a["slot_key"])
+            if b["slot_key"] in retired: revived += 1
+    written = {h.get("pin") for h in history}
+    lost = sum(1 for p in saved if p not in written)
+    rotations = sum(1 for a, b in zip(history, history[1:]) if b["slot_key"] != a["slot_key"])
+    return len(history), rotations, len(saved), stale, revived, lost
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pin-threads", type=int, default=16)
+    ap.add_argument("--rotate-threads", type=int, default=4)
+    ap.add_argument("--seconds", type=float, default=3.0)
+    args = ap.parse_args()
+    print(f"{'write_slot_data':<16} {'writes':>7} {'rotations':>9} {'PINs saved':>10} {'stale':>6} {'revived':>8} {'lost':>5}")
+    failed = False
+    for label, write in (("transactional", slots.write_slot_data), ("before (cached)", legacy_write)):
+        r = run(write, args.pin_threads, args.rotate_threads, args.seconds)
+        if write is slots.write_slot_data: failed = any(r[3:])
+        print(f"{label:<16} {r[0]:>7} {r[1]:>9} {r[2]:>10} {r[3]:>6} {r[4]:>8} {r[5]:>5}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+# core.py - config and shared logic for the app pages
+# - app2.py            student page: link check, auto-CID, attendance form
+# - pages/1_Projector  current QR + open/copy link buttons (teacher's screen)
+# - pages/2_Admin      records, exports, PIN, archive, clear
+# Imported once per process, so secrets are read once rather than on every rerun.
+import streamlit as st
+from contextlib import contextmanager
+from collections import OrderedDict
+import os, tempfile, threading, time, urllib.parse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from storage import get_storage, parse_timestamps
+from slots import (ensure_current_slot, derived_slot, log_derived_slot, derived_keys, check_derived_key, next_slot_key,
+                   next_derived_key, same_secret, link_token, token_slot, recent_slot_keys, slot_valid, slot_records,
+                   log_slot_counts)
+
+# -------- CONFIG ----------
+SLOT_TTL = 600  # 10 minutes
+ENFORCE_CID = True  # keep device-lock; set False to disable
+STORAGE_BACKEND = "csv"  # "csv", "sqlite" (WAL, indexed duplicate checks) or "sharded" (one file per slot) - see storage.py
+SLOT_MODE = "file"  # "file" (rotating key in data/current_slot.json) or "hmac" (key derived from QR_SECRET and the clock)
+SLOT_GRACE_WINDOWS = 1  # hmac mode: also accept links from this many previous slots
+SLOT_GRACE = 120  # file mode: seconds a replaced slot's links (and PIN) are still accepted
+COMPACT_LINKS = True  # QR and links carry ?t=<12-char token>; old ?key=...&s=... links are still accepted
+QR_PRERENDER_LEAD = 60  # seconds before rotation to render the next slot's QR in the background
+DISPLAY_TZ = "UTC"  # zone for shown/exported timestamps, e.g. "Asia/Kolkata"; stored values stay UTC
+EXPORT_CACHE_BYTES = 64 * 1024 * 1024  # memory budget for cached record views and export files (LRU)
+HEADCOUNT_REFRESH = 5  # seconds between live headcount updates on the projector and admin pages
+HEADCOUNT_SLOTS = 4  # admin: live headcounts for the current slot and this many before it
+# -------- SECRETS (set these in Streamlit Cloud) ----------
+QR_SECRET = st.secrets.get("QR_SECRET", "changeme")
+ADMIN_PASSWORD = st.secrets.get("ADMIN_PASSWORD", "admin")
+BASE_URL = st.secrets.get("BASE_URL", "https://qr-attendance.streamlit.app")  # match your app URL exactly
+
+# -------- UTILITIES ----------
+def now_iso_utc():
+    return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+def format_timestamps(ts):
+    # vectorized "YYYY-MM-DD HH:MM:SS" in DISPLAY_TZ; NaT becomes ""
+    if len(ts) == 0: return pd.Series([], index=ts.index, dtype=object)  # np.char.replace fails on empty arrays
+    if not isinstance(ts.dtype, pd.DatetimeTZDtype):
+        ts = parse_timestamps(pd.DataFrame({"timestamp": ts}))["timestamp"]
+    local = ts.dt.tz_convert(DISPLAY_TZ).dt.tz_localize(None).to_numpy().astype("datetime64[s]")
+    out = np.char.replace(np.datetime_as_string(local, unit="s"), "T", " ")
+    return pd.Series(np.where(ts.isna().to_numpy(), "", out), index=ts.index)
+
+def _log_dropped(counts):
+    # Storage.on_drop: the slot log keeps the headcounts of rows an archive/clear removed
+    # (rows of a slot arriving after it are added on top)
+    log_slot_counts({k: n for k, n in counts.items() if n}, field="archived")
+
+def store():
+    s = get_storage(STORAGE_BACKEND)
+    s.on_drop = _log_dropped
+    return s
+
+# -------- Slot ----------
+def current_slot():
+    if SLOT_MODE == "hmac":
+        key, created = derived_slot(QR_SECRET, SLOT_TTL)
+        log_derived_slot(key, created, SLOT_TTL)
+        return key, created
+    return ensure_current_slot(SLOT_TTL)
+
+def next_key():
+    # key of the slot after the current one (reserved in the slot file in file mode)
+    return next_derived_key(QR_SECRET, SLOT_TTL) if SLOT_MODE == "hmac" else next_slot_key()
+
+def valid_slot_keys():
+    # hmac mode; file mode checks links with token_key and slot_valid instead
+    return derived_keys(QR_SECRET, SLOT_TTL, SLOT_GRACE_WINDOWS)
+
+_token_keys = {"keys": None, "map": {}}  # file mode: link token -> slot key for the current and recent slots
+
+def token_key(token: str):
+    keys = (current_slot()[0], *recent_slot_keys())
+    if keys != _token_keys["keys"]:
+        _token_keys.update(keys=keys, map={link_token(QR_SECRET, k): k for k in keys})
+    return _token_keys["map"].get(token)
+
+def expires_in(slot_created):
+    return int(SLOT_TTL - (time.time() - slot_created))
+
+def fragment(run_every=None):
+    # st.fragment (st.experimental_fragment on older Streamlit): the decorated block reruns on its
+    # own every run_every seconds without rerunning the page; without either it renders once per run
+    f = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    return f(run_every=run_every) if f else (lambda fn: fn)
+
+def live_headcounts(n=HEADCOUNT_SLOTS):
+    # {slot_key: rows} for the current slot and up to n before it, newest first; from memory
+    if SLOT_MODE == "hmac":
+        keys = derived_keys(QR_SECRET, SLOT_TTL, n)
+    else:
+        cur = current_slot()[0]
+        keys = [cur] + [k for k in reversed(recent_slot_keys()) if k != cur][:n]
+    return store().headcounts(keys)
+
+# -------- Links ----------
+def build_link(slot_key: str, cid: str = None):
+    params = {"t": link_token(QR_SECRET, slot_key)} if COMPACT_LINKS else {"key": slot_key, "s": QR_SECRET}
+    if cid: params["cid"] = cid
+    return f"{BASE_URL}/?{urllib.parse.urlencode(params)}"
+
+def link_slot(params):
+    # slot key a scanned link was issued for, or None if the link is not valid now
+    # (file mode: the current slot, or a recent one replaced less than SLOT_GRACE seconds ago)
+    if SLOT_MODE == "hmac":
+        if "t" in params:
+            return token_slot(params.get("t", [""])[0], QR_SECRET, valid_slot_keys())
+        if "key" in params and "s" in params:
+            key = params.get("key", [""])[0]
+            if same_secret(params.get("s", [""])[0], QR_SECRET) and check_derived_key(key, QR_SECRET, SLOT_TTL, SLOT_GRACE_WINDOWS):
+                return key
+        return None
+    if "t" in params:
+        key = token_key(params.get("t", [""])[0])
+    elif "key" in params and "s" in params and same_secret(params.get("s", [""])[0], QR_SECRET):
+        current_slot(); key = params.get("key", [""])[0]
+    else:
+        return None
+    return key if key and slot_valid(key, SLOT_TTL, SLOT_GRACE) else None
+
+# -------- Export helpers ----------
+EXPORT_COLUMNS = ["timestamp","slot_key","name","email"]  # cid stays out of exports
+
+def df_for_export(df):
+    if df.empty: return df
+    d = df.copy()
+    if "timestamp" in d.columns:
+        d["timestamp"] = format_timestamps(d["timestamp"])
+    cols = [c for c in EXPORT_COLUMNS if c in d.columns]
+    return d.loc[:, cols]
+
+def iter_export_csv(chunks):
+    # CSV bytes of df_for_export, one storage chunk at a time (header with the first)
+    header = True
+    for chunk in chunks:
+        yield df_for_export(chunk).to_csv(index=False, header=header).encode("utf-8"); header = False
+    if header: yield (",".join(EXPORT_COLUMNS) + "\n").encode("utf-8")
+
+@contextmanager
+def _temp_path(suffix):
+    fd, path = tempfile.mkstemp(suffix=suffix); os.close(fd)
+    try:
+        yield path
+    finally:
+        os.unlink(path)
+
+@contextmanager
+def spooled(parts):
+    # write byte chunks to a temp file and yield it opened for reading; st.download_button
+    # reads it once, so only one chunk is ever held in memory while the export is built
+    with _temp_path(".csv") as path:
+        with open(path, "wb") as f:
+            for p in parts: f.write(p)
+        with open(path, "rb") as f:
+            yield f
+
+XLSX_MAX_ROWS = 1_048_575  # rows per sheet after the header; longer sheets continue on "<name> (2)" etc.
+
+def write_xlsx(chunks, path, per_slot=False):
+    # write-only openpyxl workbook: each sheet streams its rows to a temp file as they are
+    # appended, so memory does not grow with the row count. per_slot puts every slot on its
+    # own sheet (rows of different slots may arrive interleaved).
+    wb = Workbook(write_only=True); sheets = {}  # name -> [worksheet, rows]
+    def sheet(name):
+        s = sheets.get(name)
+        if s is None or s[1] >= XLSX_MAX_ROWS:
+            n = 1 if s is None else s[2] + 1
+            ws = wb.create_sheet(title=name[:25] if n == 1 else f"{name[:25]} ({n})")
+            ws.append(EXPORT_COLUMNS); s = sheets[name] = [ws, 0, n]
+        return s
+    for chunk in chunks:
+        d = df_for_export(chunk)
+        if d.empty: continue
+        d = d.fillna("")
+        groups = d.groupby("slot_key", sort=False) if per_slot else [("attendance", d)]
+        for name, part in groups:
+            for row in part.itertuples(index=False, name=None):
+                s = sheet(str(name)); s[0].append(row); s[1] += 1
+    if not sheets: sheet("attendance")
+    wb.save(path)
+
+@contextmanager
+def spooled_xlsx(chunks, per_slot=False):
+    with _temp_path(".xlsx") as path:
+        write_xlsx(chunks, path, per_slot)
+        with open(path, "rb") as f:
+            yield f
+
+# -------- Export cache ----------
+class ExportCache:
+    """LRU of built views/exports, bounded by their total size in bytes.
+
+    Keys include the storage version, so a write makes old entries unreachable
+    and they age out; an item larger than the whole budget is built but not kept.
+    """
+    def __init__(self, max_bytes=EXPORT_CACHE_BYTES):
+        self.max_bytes = max_bytes; self._items = OrderedDict(); self._bytes = 0; self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None: return None
+            self._items.move_to_end(key); return item[0]
+
+    def put(self, key, value, size):
+        with self._lock:
+            if key in self._items: self._bytes -= self._items.pop(key)[1]
+            if size > self.max_bytes: return
+            self._items[key] = (value, size); self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._bytes -= self._items.popitem(last=False)[1][1]
+
+    def get_or_build(self, key, build, sizeof=len):
+        value = self.get(key)
+        if value is None:
+            value = build(); self.put(key, value, sizeof(value))
+        return value
+
+_exports = ExportCache()
+
+def _spooled_bytes(ctx):
+    with ctx as f:
+        return f.read()
+
+def _frame_bytes(d):
+    return int(np.sum(d.memory_usage(deep=True)))  # DataFrame or Series
+
+def export_view(slot_key=None):
+    # df_for_export of the whole log (or one slot), for st.dataframe
+    s = store()
+    return _exports.get_or_build(("view", slot_key, DISPLAY_TZ, s.version()), lambda: df_for_export(s.read_df(slot_key)),
+                                 sizeof=_frame_bytes)
+
+def slot_counts():
+    # records per slot, streamed; stays small however long the log gets
+    s = store()
+    return _exports.get_or_build(("counts", s.version()), s.counts, sizeof=_frame_bytes)
+
+def export_csv_bytes():
+    s = store()
+    return _exports.get_or_build(("csv", DISPLAY_TZ, s.version()), lambda: _spooled_bytes(spooled(iter_export_csv(s.iter_chunks()))))
+
+def cached_csv_bytes():
+    # the CSV for the current storage version if it was already built, else None
+    return _exports.get(("csv", DISPLAY_TZ, store().version()))
+
+def cached_xlsx_bytes(per_slot=False):
+    # the XLSX for the current storage version if it was already built, else None
+    return _exports.get(("xlsx", per_slot, DISPLAY_TZ, store().version()))
+
+def export_xlsx_bytes(per_slot=False):
+    s = store()
+    return _exports.get_or_build(("xlsx", per_slot, DISPLAY_TZ, s.version()),
+                                 lambda: _spooled_bytes(spooled_xlsx(s.iter_chunks(), per_slot)))
+
+# -------- Lectures ----------
+LECTURE_COLUMNS = ["created", "expired", "pin_set_at", "headcount", "slot_key"]
+
+def _closed(rec, now):
+    # no more (late) submissions can arrive for this slot
+    return rec["expired"] is not None and now - rec["expired"] > SLOT_GRACE
+
+def close_lectures(start=None, end=None):
+    # headcount = rows archived earlier + rows stored now; written to the slot log as final once
+    # the slot is closed, so later views (and archives) no longer need the rows
+    now = time.time(); live = None; final = {}
+    recs = slot_records(start, end)
+    for r in recs:
+        if r["count"] is None:
+            if live is None: live = slot_counts()
+            r["count"] = r["archived"] + int(live.get(r["slot_key"], 0))
+            if r["count"] and _closed(r, now): final[r["slot_key"]] = r["count"]
+    if final: log_slot_counts(final)
+    return recs
+
+def lecture_report(start=None, end=None):
+    # one row per slot created in [start, end) (epoch seconds): times in DISPLAY_TZ and headcount.
+    # Reads the slot log and the per-slot counts, never the attendance rows.
+    recs = close_lectures(start, end)
+    d = pd.DataFrame(recs, columns=["slot_key", "created", "expired", "pin_set_at", "count"])
+    for c in ("created", "expired", "pin_set_at"):
+        d[c] = format_timestamps(pd.to_datetime(d[c], unit="s", utc=True))
+    return d.rename(columns={"count": "headcount"}).astype({"headcount": "int64"}).loc[:, LECTURE_COLUMNS]
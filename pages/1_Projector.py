@@ -0,0 +1,64 @@
+# pages/1_Projector.py - current QR and link buttons for the teacher's screen
+import streamlit as st
+import uuid
+from qr import make_qr_image, prerender
+from core import (SLOT_TTL, QR_PRERENDER_LEAD, HEADCOUNT_REFRESH, current_slot, next_key, expires_in, build_link, fragment,
+                  live_headcounts)
+
+st.set_page_config(page_title="QR Attendance — Projector", layout="wide")
+
+# -------- Prepare UI and slot ----------
+# precompute safe fallback cid to avoid f-string-in-js issues
+fallback_cid = uuid.uuid4().hex
+
+slot_key, slot_created = current_slot()
+expires = expires_in(slot_created)
+canonical_link = build_link(slot_key)  # no-cid link encoded in QR
+if 0 < expires <= QR_PRERENDER_LEAD:
+    nxt = next_key()
+    if nxt: prerender(build_link(nxt))
+
+# -------- UI layout ----------
+st.title("📋 QR Attendance — scan to check in")
+st.write("Slot key:", f"`{slot_key}`")
+st.write(f"QR slot length: **{int(SLOT_TTL/60)} minutes** • refresh in **{expires}s**")
+qr_col, count_col = st.columns([1, 2])
+qr_col.image(make_qr_image(canonical_link), width=220, caption="Scan this QR with phone camera")
+
+@fragment(run_every=HEADCOUNT_REFRESH)
+def headcount():
+    # check-ins for the slot of the QR on screen; reruns on its own, the QR is not redrawn
+    st.metric("Checked in", live_headcounts(0).get(slot_key, 0))
+
+with count_col:
+    headcount()
+st.markdown("**Links below attach your browser's device id (cid)**")
+admin_js = f"""
+<div style="display:flex;gap:8px;flex-wrap:wrap;">
+  <button id="openWithCid" style="padding:8px 12px;background:#2b6cb0;color:white;border:none;border-radius:8px;">Open in new tab (with cid)</button>
+  <button id="copyWithCid" style="padding:8px 12px;background:#4a5568;color:white;border:none;border-radius:8px;">Copy link (with cid)</button>
+</div>
+<script>
+  function getCidLocal() {{
+    try {{
+      let c = localStorage.getItem('attendance_cid');
+      if(!c) {{ c = (crypto && crypto.randomUUID) ? crypto.randomUUID() : "{fallback_cid}"; localStorage.setItem('attendance_cid', c); }}
+      return c;
+    }} catch(e) {{ return "{fallback_cid}"; }}
+  }}
+  document.getElementById('openWithCid').onclick = function() {{
+    const cid = encodeURIComponent(getCidLocal());
+    window.open("{canonical_link}&cid=" + cid, "_blank");
+  }};
+  document.getElementById('copyWithCid').onclick = async function() {{
+    try {{
+      const cid = encodeURIComponent(getCidLocal());
+      const url = "{canonical_link}&cid=" + cid;
+      await navigator.clipboard.writeText(url);
+      this.innerText='Copied';
+      setTimeout(()=>this.innerText='Copy link (with cid)',1200);
+    }} catch(e) {{ alert('Copy failed'); }}
+  }};
+</script>
+"""
+st.components.v1.html(admin_js, height=90)
@@ -0,0 +1,160 @@
+# pages/2_Admin.py - records, exports, PIN, archive and clear (password protected)
+import streamlit as st
+import uuid
+from datetime import date, timedelta
+import pandas as pd
+from slots import get_current_pin, set_current_pin
+from storage import OUT_OF_CORE, writer_metrics
+from core import (ADMIN_PASSWORD, DISPLAY_TZ, HEADCOUNT_REFRESH, store, current_slot, export_view, slot_counts, export_csv_bytes,
+                  cached_csv_bytes, cached_xlsx_bytes, export_xlsx_bytes, lecture_report, fragment, live_headcounts)
+
+st.set_page_config(page_title="QR Attendance — Admin", layout="wide")
+
+slot_key, slot_created = current_slot()
+
+# -------- Admin panel (password protected) ----------
+st.title("📋 QR Attendance — Admin")
+pw = st.text_input("Admin password", type="password")
+
+@fragment(run_every=HEADCOUNT_REFRESH)
+def headcounts():
+    # current slot first, then the ones before it; refreshed without rerunning the page
+    counts = live_headcounts()
+    for i, (col, (key, n)) in enumerate(zip(st.columns(len(counts)), counts.items())):
+        col.metric("Current slot" if i == 0 else f"{i} slot{'s' if i > 1 else ''} ago", n, help=key)
+
+if pw == ADMIN_PASSWORD:
+    st.subheader("Live headcount")
+    headcounts()
+
+xlsx_per_slot = st.checkbox("Excel: one sheet per slot")
+if st.button("Show records"):
+    if pw == ADMIN_PASSWORD:
+        st.session_state["show_records"] = True
+    else:
+        st.error("Wrong admin password.")
+# stays open across reruns (downloads, Prepare Excel) while the password is entered
+if st.session_state.get("show_records") and pw == ADMIN_PASSWORD:
+    if OUT_OF_CORE:
+        # large-log mode: never load the whole log; headcounts per slot plus the current slot's rows
+        counts = slot_counts(); view = export_view(slot_key)
+        empty = counts.empty
+        if not empty:
+            st.write(f"{int(counts.sum())} records in {len(counts)} slots; showing the current slot.")
+            st.dataframe(counts.rename_axis("slot_key").reset_index())
+    else:
+        view = export_view(); empty = view.empty
+    if empty:
+        st.info("No records yet.")
+    else:
+        st.dataframe(view)
+        if OUT_OF_CORE:
+            # the whole log in one download: built only when asked for, like the Excel file
+            csv_bytes = cached_csv_bytes()
+            if csv_bytes is None and st.button("Prepare CSV"):
+                csv_bytes = export_csv_bytes()
+        else:
+            csv_bytes = export_csv_bytes()
+        if csv_bytes is not None:
+            st.download_button("Download CSV", data=csv_bytes, file_name="attendance.csv", mime="text/csv")
+        try:
+            # built only when asked for; reused until the records change
+            xlsx = cached_xlsx_bytes(xlsx_per_slot)
+            if xlsx is None and st.button("Prepare Excel (.xlsx)"):
+                xlsx = export_xlsx_bytes(xlsx_per_slot)
+            if xlsx is not None:
+                st.download_button("Download Excel (.xlsx)", data=xlsx, file_name="attendance.xlsx")
+        except Exception as e:
+            st.error("Excel export failed."); st.text(str(e))
+    m = writer_metrics()
+    if m:
+        st.caption(f"Write queue: {m['depth']} waiting (peak {m['max_depth']}), wait avg {m['wait_avg'] * 1000:.0f} ms"
+                   f" / max {m['wait_max'] * 1000:.0f} ms, {m['written']} rows in {m['batches']} writes,"
+                   f" {m['rejected']} turned away, {m['timeouts']} timed out.")
+
+st.markdown("---")
+st.subheader("Lectures")
+# one row per slot from the slot log, with its headcount; kept after records are archived or cleared
+c1, c2 = st.columns(2)
+lec_from = c1.date_input("From", value=date.today() - timedelta(days=30))
+lec_to = c2.date_input("To", value=date.today())
+if st.button("Show lectures"):
+    if pw == ADMIN_PASSWORD:
+        st.session_state["show_lectures"] = True
+    else:
+        st.error("Wrong admin password.")
+if st.session_state.get("show_lectures") and pw == ADMIN_PASSWORD:
+    start = pd.Timestamp(lec_from, tz=DISPLAY_TZ).timestamp()
+    end = pd.Timestamp(lec_to + timedelta(days=1), tz=DISPLAY_TZ).timestamp()
+    lectures = lecture_report(start, end)
+    if lectures.empty:
+        st.info("No lectures in this range.")
+    else:
+        st.write(f"{len(lectures)} lectures, {int(lectures['headcount'].sum())} check-ins.")
+        st.dataframe(lectures)
+
+st.markdown("---")
+st.subheader("Class PIN (teacher controls for current slot)")
+current_pin = get_current_pin(slot_key)
+st.write("Current PIN set for this slot:", ("`"+str(current_pin)+"`") if current_pin else "No PIN set")
+# set / generate / clear
+pin_input = st.text_input("Set PIN (4-8 chars)", key="pin_input")
+if st.button("Set PIN"):
+    if pw != ADMIN_PASSWORD:
+        st.error("Enter admin password first.")
+    elif not pin_input or len(pin_input.strip()) < 2:
+        st.warning("Choose a PIN of at least 2 characters.")
+    else:
+        ok = set_current_pin(pin_input.strip(), slot_key)
+        if ok:
+            st.success("PIN saved for current slot.")
+        else:
+            st.error("Failed to save PIN.")
+
+if st.button("Generate random 4-digit PIN"):
+    if pw != ADMIN_PASSWORD:
+        st.error("Enter admin password first.")
+    else:
+        rnd = str(uuid.uuid4().int)[:4]
+        ok = set_current_pin(rnd, slot_key)
+        if ok:
+            st.success(f"Generated PIN: `{rnd}` (saved for current slot)")
+        else:
+            st.error("Failed to save generated PIN.")
+
+if st.button("Clear PIN for this slot"):
+    if pw != ADMIN_PASSWORD:
+        st.error("Enter admin password first.")
+    else:
+        ok = set_current_pin("", slot_key)
+        if ok:
+            st.success("PIN cleared for current slot.")
+        else:
+            st.error("Failed to clear PIN.")
+
+st.markdown("---")
+st.write("Archive current records (moves CSV to data/archive_)")
+archive_token = st.text_input("Type ARCHIVE to confirm", key="arch_token")
+if st.button("Archive now"):
+    if pw != ADMIN_PASSWORD:
+        st.error("Enter admin password first.")
+    elif archive_token != "ARCHIVE":
+        st.warning("Type ARCHIVE exactly to confirm.")
+    else:
+        ok, info = store().archive()
+        if ok: st.success(f"Archived: {info}")
+        else: st.error(f"Archive failed: {info}")
+
+st.write("Clear current records (delete all and start fresh)")
+clear_token = st.text_input("Type CLEAR to confirm", key="clear_token")
+if st.button("Clear now"):
+    if pw != ADMIN_PASSWORD:
+        st.error("Enter admin password first.")
+    elif clear_token != "CLEAR":
+        st.warning("Type CLEAR exactly to confirm.")
+    else:
+        ok, info = store().clear()
+        if ok: st.success("Cleared current records.")
+        else: st.error(f"Clear failed: {info}")
+
+st.caption("PIN is tied to the current slot and will be cleared automatically when the slot rotates. PIN is not included in exported files.")
@@ -0,0 +1,70 @@
+# qr.py - QR rendering for the projector page, cached per process
+# The encoded image only changes when the slot rotates, so each rerun after the
+# first one for a slot is a dict lookup instead of a QR build + image encode.
+from io import BytesIO
+from collections import OrderedDict
+import threading
+import qrcode
+import qrcode.image.svg
+from qrcode.constants import ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q, ERROR_CORRECT_H
+
+# -------- CONFIG ----------
+QR_CACHE_SIZE = 8  # rendered images kept (current + next slot for a few option sets); 0 disables caching
+QR_FORMAT = "png"  # "png" (PIL raster) or "svg" (vector path, no raster encode)
+QR_BOX_SIZE = 10  # pixels per module (png only; st.image scales the result anyway)
+QR_BORDER = 4  # quiet zone in modules; the spec asks for 4, 2 still scans on most phones
+QR_ERROR = "M"  # error correction: L (7%), M (15%), Q (25%), H (30%); lower = smaller version
+
+ERROR_LEVELS = {"L": ERROR_CORRECT_L, "M": ERROR_CORRECT_M, "Q": ERROR_CORRECT_Q, "H": ERROR_CORRECT_H}
+
+# -------- Rendering ----------
+def build_qr(link: str, error=QR_ERROR, box_size=QR_BOX_SIZE, border=QR_BORDER):
+    # version=None + fit=True picks the smallest QR version that holds the link
+    q = qrcode.QRCode(version=None, error_correction=ERROR_LEVELS[error], box_size=box_size, border=border)
+    q.add_data(link); q.make(fit=True)
+    return q
+
+def _render(link, fmt, box_size, border, error):
+    q = build_qr(link, error, box_size, border)
+    if fmt == "svg":
+        return q.make_image(image_factory=qrcode.image.svg.SvgPathImage).to_string()
+    b = BytesIO(); q.make_image().save(b, format="PNG")
+    return b.getvalue()
+
+# -------- Render cache ----------
+_cache = OrderedDict()  # (link, options) -> encoded bytes, least recently used first
+_lock = threading.Lock()
+_pending = set()  # keys being pre-rendered in the background
+
+def _options(fmt, box_size, border, error):
+    return (fmt or QR_FORMAT, box_size or QR_BOX_SIZE, QR_BORDER if border is None else border, error or QR_ERROR)
+
+def render_qr(link: str, fmt=None, box_size=None, border=None, error=None):
+    """Encoded QR for `link` (PNG or SVG bytes), from the cache when possible."""
+    opts = _options(fmt, box_size, border, error); key = (link, opts)
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key); return _cache[key]
+    data = _render(link, *opts)
+    if QR_CACHE_SIZE > 0:
+        with _lock:
+            _cache[key] = data; _cache.move_to_end(key)
+            while len(_cache) > QR_CACHE_SIZE: _cache.popitem(last=False)
+    return data
+
+def make_qr_image(link: str, fmt=None, box_size=None, border=None, error=None):
+    # what st.image accepts: a PNG file-like object or an SVG string
+    data = render_qr(link, fmt, box_size, border, error)
+    return data.decode("utf-8") if (fmt or QR_FORMAT) == "svg" else BytesIO(data)
+
+def prerender(link: str, fmt=None, box_size=None, border=None, error=None):
+    # render in a background thread so the rerun right after rotation finds it cached
+    key = (link, _options(fmt, box_size, border, error))
+    with _lock:
+        if key in _cache or key in _pending: return
+        _pending.add(key)
+    def work():
+        try: render_qr(link, fmt, box_size, border, error)
+        finally:
+            with _lock: _pending.discard(key)
+    threading.Thread(target=work, daemon=True).start()
@@ -0,0 +1,397 @@
+# slots.py - current slot (slot_key + created + optional pin), imported by core.py and the pages
+# The parsed slot file is cached per process: Streamlit reruns the script on every
+# widget interaction, and each rerun asks for the slot and the PIN several times.
+from pathlib import Path
+from contextlib import nullcontext
+from collections import OrderedDict
+import bisect, json, os, threading, time, uuid, hmac, hashlib, base64
+from storage import DATA_DIR, file_lock, file_sig
+
+# -------- CONFIG ----------
+SLOT_TTL = 600  # default; core.py passes its own
+SLOT_CACHE_RECHECK = 0.5  # seconds between stat() checks for changes made by other processes
+SLOT_HISTORY = 8  # recent slots (created, replaced, PIN) kept in memory for late submissions
+
+# -------- PATHS ----------
+SLOT_FILE = DATA_DIR / "current_slot.json"
+SLOT_LOG = DATA_DIR / "slot_log.jsonl"  # append-only: one line per rotation, PIN change and final headcount
+
+# -------- JSON helpers ----------
+def atomic_write_json(path: Path, data: dict):
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush(); os.fsync(f.fileno())
+    tmp.replace(path)
+
+def read_json_safe(path: Path, lock=True):
+    # lock=False when the caller already holds the file's exclusive lock
+    if not path.exists(): return None
+    try:
+        with (file_lock(path, exclusive=False) if lock else nullcontext()), open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+# -------- Slot cache ----------
+class SlotCache:
+    """Parsed copy of a JSON file, revalidated by (inode, size, mtime_ns) instead of open+parse.
+
+    Writes made in this process go through put(), so they are visible at once.
+    Changes made by other processes are noticed within `recheck` seconds; the
+    atomic replace in atomic_write_json always yields a new inode, so coarse
+    mtimes cannot hide a change.
+    """
+    def __init__(self, path: Path, recheck=SLOT_CACHE_RECHECK):
+        self.path = Path(path); self.recheck = recheck; self._lock = threading.Lock()
+        self._sig = None; self._data = None; self._checked = 0.0
+
+    def get(self):
+        now = time.monotonic()
+        if self._sig is not None and now - self._checked < self.recheck:
+            return self._data
+        sig = file_sig(self.path)
+        if sig is None or sig != self._sig:
+            data = read_json_safe(self.path) if sig is not None else None
+            with self._lock: self._sig, self._data = sig, data
+        self._checked = now
+        return self._data
+
+    def put(self, data: dict):
+        with self._lock:
+            self._sig, self._data, self._checked = file_sig(self.path), data, time.monotonic()
+
+_cache = SlotCache(SLOT_FILE)
+
+# -------- Slot history ----------
+class SlotHistory:
+    """Ring of the last `size` slots: slot_key -> {"created", "until", "pin"}, oldest first.
+
+    Backed by SLOT_LOG, an append-only JSON-lines log of rotations
+    ({"slot_key", "created", "expired"}, expired being when the slot it replaced
+    ran out) and PIN changes ({"slot_key", "pin", "pin_set_at"}), appended under
+    the slot-file lock. "until" is when the slot was replaced. Lookups are dict
+    probes; lines appended by other processes are read in when the log's stat
+    signature changes (checked at most every `recheck` s).
+    """
+    TAIL = 256 * 1024  # bytes of the log read on load; far more than `size` slots need
+
+    def __init__(self, path: Path, size=SLOT_HISTORY, recheck=SLOT_CACHE_RECHECK):
+        self.path = Path(path); self.size = size; self.recheck = recheck; self._lock = threading.Lock()
+        self._ring = OrderedDict(); self._newest = None; self._sig = None; self._checked = 0.0; self.version = 0
+
+    def _apply(self, ev, ring, newest):
+        # one log event into `ring`; returns the newest slot key
+        key = ev.get("slot_key")
+        if not key or ("created" not in ev and "pin" not in ev): return newest  # headcounts are for SlotLog
+        e = ring.get(key)
+        if e is None: e = ring[key] = {"created": None, "until": None, "pin": ""}
+        if "created" in ev:
+            if newest in ring and newest != key and ring[newest]["until"] is None:
+                ring[newest]["until"] = ev.get("expired", ev["created"])
+            e["created"] = ev["created"]; newest = key; ring.move_to_end(key)
+        if "pin" in ev: e["pin"] = ev["pin"]
+        while len(ring) > self.size: ring.popitem(last=False)
+        return newest
+
+    def _refresh(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._checked < self.recheck: return
+        self._checked = now
+        old = self._sig; sig = file_sig(self.path)
+        if sig == old: return
+        # rebuilt aside and swapped in, so lookups never see a half-loaded ring
+        ring = OrderedDict(); newest = None
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(max(0, sig[1] - self.TAIL) if sig else 0)
+                lines = f.read().splitlines()
+            if sig and sig[1] > self.TAIL: lines = lines[1:]  # first line may be cut
+            for line in lines:
+                try: newest = self._apply(json.loads(line), ring, newest)
+                except ValueError: pass
+        except OSError:
+            pass
+        with self._lock:
+            if self._sig != old: return  # a record() or another refresh got there first
+            self._ring, self._newest, self._sig = ring, newest, sig; self.version += 1
+
+    def record(self, ev: dict):
+        # caller holds _slot_lock and file_lock(SLOT_FILE); read in other processes' lines first
+        self._refresh(force=True)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(ev) + "\n")
+            self._newest = self._apply(ev, self._ring, self._newest)
+            self._sig = file_sig(self.path); self.version += 1
+
+    def get(self, slot_key):
+        self._refresh()
+        e = self._ring.get(slot_key)
+        return dict(e) if e else None
+
+    def keys(self):
+        self._refresh()
+        return list(self._ring)
+
+_history = SlotHistory(SLOT_LOG)
+
+def recent_slot_keys():
+    # keys of the last SLOT_HISTORY slots, oldest first
+    return _history.keys()
+
+# -------- Slot log (audit / per-lecture reporting) ----------
+class SlotLog:
+    """Every slot in SLOT_LOG: slot_key -> {"slot_key", "created", "expired", "pin_set_at", "count", "archived"}.
+
+    Besides the rotation and PIN events of SlotHistory the log holds
+    {"slot_key", "count", "counted_at"} lines: a slot's final headcount, written
+    once its grace window has closed, so it survives archiving the records; and
+    {"slot_key", "archived", "counted_at"} lines: rows of a slot that an archive
+    or clear is about to drop, summed, so the headcount still includes them.
+    The file is parsed incrementally from the last offset read. Created times
+    are kept sorted next to their keys, so a time range is two bisects.
+    """
+    def __init__(self, path: Path):
+        self.path = Path(path); self._lock = threading.Lock()
+        self._slots = {}; self._times = []; self._keys = []; self._newest = None; self._pos = 0; self._sig = None
+
+    def _reset(self):
+        self._slots = {}; self._times = []; self._keys = []; self._newest = None; self._pos = 0
+
+    def _apply(self, ev):
+        key = ev.get("slot_key")
+        if not key: return
+        e = self._slots.get(key)
+        if e is None:
+            e = self._slots[key] = {"slot_key": key, "created": None, "expired": None, "pin_set_at": None, "count": None,
+                                    "archived": 0}
+        if "created" in ev:
+            prev = self._slots.get(self._newest)
+            if prev is not None and self._newest != key and prev["expired"] is None:
+                prev["expired"] = ev.get("expired", ev["created"])
+            if e["created"] is None:
+                i = bisect.bisect_right(self._times, ev["created"])
+                self._times.insert(i, ev["created"]); self._keys.insert(i, key)
+                e["created"] = ev["created"]
+            self._newest = key
+        if "pin" in ev: e["pin_set_at"] = ev.get("pin_set_at") if ev["pin"] else None
+        if "count" in ev: e["count"] = ev["count"]
+        if "archived" in ev: e["archived"] += ev["archived"]
+
+    def _refresh(self):
+        sig = file_sig(self.path)
+        if sig == self._sig: return
+        if sig is None or self._sig is None or sig[0] != self._sig[0] or sig[1] < self._pos: self._reset()
+        if sig is not None:
+            with open(self.path, "rb") as f:
+                f.seek(self._pos); data = f.read(sig[1] - self._pos)
+            done = data.rfind(b"\n") + 1  # a line still being appended is read next time
+            for line in data[:done].splitlines():
+                try: self._apply(json.loads(line))
+                except ValueError: pass
+            self._pos += done
+        self._sig = sig
+
+    def get(self, slot_key):
+        with self._lock:
+            self._refresh()
+            e = self._slots.get(slot_key)
+            return dict(e) if e else None
+
+    def between(self, start=None, end=None):
+        # slots created in [start, end) (epoch seconds; None = unbounded), oldest first
+        with self._lock:
+            self._refresh()
+            i = 0 if start is None else bisect.bisect_left(self._times, start)
+            j = len(self._times) if end is None else bisect.bisect_left(self._times, end)
+            return [dict(self._slots[k]) for k in self._keys[i:j]]
+
+_slot_log = SlotLog(SLOT_LOG)
+
+def slot_records(start=None, end=None):
+    return _slot_log.between(start, end)
+
+def log_slot_counts(counts: dict, field="count"):
+    # {slot_key: rows}: final headcounts of slots that no longer accept submissions ("count"),
+    # or rows an archive/clear is about to drop ("archived")
+    now_ts = int(time.time())
+    lines = "".join(json.dumps({"slot_key": k, field: int(n), "counted_at": now_ts}) + "\n" for k, n in counts.items())
+    try:
+        with _slot_lock, file_lock(SLOT_FILE), open(SLOT_LOG, "a", encoding="utf-8") as f:
+            f.write(lines)  # one append; the history ring has no use for headcounts
+        return True
+    except OSError:
+        return False
+
+def slot_valid(slot_key, ttl=SLOT_TTL, grace=0, now=None):
+    # the current slot, or one replaced less than `grace` seconds ago; O(1)
+    now = time.time() if now is None else now
+    d = read_slot_data()
+    if slot_key and slot_key == d.get("slot_key") and now - int(d.get("created", 0)) <= ttl: return True
+    e = _history.get(slot_key)
+    return bool(e and e["until"] is not None and now - e["until"] <= grace)
+
+_slot_lock = threading.Lock()  # with file_lock(SLOT_FILE): one slot-file writer across threads and processes
+
+def _write_locked(data: dict):
+    # caller holds _slot_lock and file_lock(SLOT_FILE); every write bumps "version"
+    data["version"] = int(data.get("version", 0)) + 1
+    try:
+        atomic_write_json(SLOT_FILE, data)
+    except Exception:
+        with open(SLOT_FILE, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+    _cache.put(data)
+
+def _write(data: dict):
+    with _slot_lock, file_lock(SLOT_FILE):
+        _write_locked(data)
+
+# -------- Slot management (slot_key + created + optional pin) ----------
+def _live(data, ttl, now_ts):
+    if not isinstance(data, dict) or not data.get("slot_key"): return False
+    return now_ts - int(data.get("created", 0)) <= ttl
+
+def ensure_current_slot(ttl=SLOT_TTL):
+    now_ts = int(time.time())
+    data = _cache.get()
+    if _live(data, ttl, now_ts):
+        return data["slot_key"], int(data["created"])
+    # expired: compare-and-swap under the lock. Re-read the file; if it now holds a live slot
+    # (a later version than the expired one we saw), another rerun or process already rotated
+    # and we adopt its key without writing. Otherwise we rotate: new slot (clears PIN),
+    # version + 1, adopting the key reserved by next_slot_key() if any.
+    try:
+        with _slot_lock, file_lock(SLOT_FILE):
+            cur = read_json_safe(SLOT_FILE, lock=False)
+            cur = cur if isinstance(cur, dict) else {}
+            if _live(cur, ttl, now_ts):
+                _cache.put(cur)
+                return cur["slot_key"], int(cur["created"])
+            new_data = {"slot_key": cur.get("next_slot_key") or uuid.uuid4().hex, "created": now_ts,
+                        "version": cur.get("version", 0)}
+            _write_locked(new_data)
+            # the replaced slot stopped accepting at its TTL, even if nobody loaded a page until later
+            _log({"slot_key": new_data["slot_key"], "created": now_ts,
+                  "expired": min(now_ts, int(cur.get("created", now_ts)) + ttl)})
+            return new_data["slot_key"], now_ts
+    except Exception:
+        return (data or {}).get("slot_key") or uuid.uuid4().hex, now_ts
+
+def next_slot_key():
+    # reserve the key the next rotation will use, so its QR can be rendered ahead of time
+    nxt = read_slot_data().get("next_slot_key")
+    if nxt: return nxt
+    d = update_slot_data(lambda d: d if d.get("next_slot_key") else {**d, "next_slot_key": uuid.uuid4().hex})
+    return d.get("next_slot_key") if d else None
+
+def read_slot_data():
+    d = _cache.get()
+    return dict(d) if isinstance(d, dict) else {}
+
+def _log(ev):
+    try:
+        _history.record(ev)
+    except Exception:
+        pass  # the slot file stays authoritative for the current slot
+
+def update_slot_data(fn, log=None):
+    """Transactional read-modify-write of the slot file; returns the data written, or None.
+
+    fn gets a fresh copy of the file read under the lock (never the cache, which
+    may predate a rotation) and returns the new data; returning it unchanged
+    skips the write. _slot_lock plus the exclusive file_lock(SLOT_FILE) make the
+    read, fn and the write one step for every writer in every process; where
+    file_lock is a no-op (no fcntl) only threads of this process are excluded.
+    One atomic write, one fsync. `log` is appended to the slot log after the write.
+    """
+    try:
+        with _slot_lock, file_lock(SLOT_FILE):
+            cur = read_json_safe(SLOT_FILE, lock=False)
+            cur = cur if isinstance(cur, dict) else {}
+            new = fn(dict(cur))
+            if new == cur: return cur
+            _write_locked(new)
+            if log: _log(log)
+            return new
+    except Exception:
+        return None
+
+def write_slot_data(updates: dict):
+    return update_slot_data(lambda d: {**d, **updates}) is not None
+
+def get_current_pin(slot_key: str = None):
+    # the PIN set for slot_key: from the slot file when it belongs to that slot (pin_slot),
+    # otherwise from the slot history, so a replaced slot keeps its PIN for late submissions
+    d = read_slot_data()
+    if slot_key is None or d.get("pin_slot") == slot_key: return d.get("pin")
+    if "pin_slot" not in d and d.get("slot_key", slot_key) == slot_key: return d.get("pin")  # untagged: current slot
+    e = _history.get(slot_key)
+    return e["pin"] if e else None
+
+def set_current_pin(pin_value: str, slot_key: str = None):
+    pin = str(pin_value).strip(); now_ts = int(time.time())
+    tag = {"pin_slot": slot_key} if slot_key is not None else {}
+    log = {"slot_key": slot_key, "pin": pin, "pin_set_at": now_ts} if slot_key is not None else None
+    if pin == "":
+        # clear
+        return update_slot_data(lambda d: {**d, "pin": "", **tag}, log=log) is not None
+    else:
+        return update_slot_data(lambda d: {**d, "pin": pin, "pin_set_at": now_ts, **tag}, log=log) is not None
+
+# -------- Derived slots (SLOT_MODE = "hmac") ----------
+# slot_key = HMAC(QR_SECRET, floor(now / ttl)): every process computes the same key
+# with no file read or write, and validating a link is pure computation.
+def slot_window(ttl=SLOT_TTL, now=None):
+    return int((time.time() if now is None else now) // ttl)
+
+def hmac_slot_key(secret: str, window: int):
+    return hmac.new(secret.encode("utf-8"), b"slot:%d" % window, hashlib.sha256).hexdigest()[:32]
+
+def same_secret(given, expected: str) -> bool:
+    # constant-time comparison; compare_digest refuses non-ASCII str, so compare UTF-8 bytes
+    return hmac.compare_digest(str(given).encode("utf-8", "surrogatepass"), expected.encode("utf-8"))
+
+def next_derived_key(secret: str, ttl=SLOT_TTL, now=None):
+    return hmac_slot_key(secret, slot_window(ttl, now) + 1)
+
+def derived_slot(secret: str, ttl=SLOT_TTL, now=None):
+    w = slot_window(ttl, now)
+    return hmac_slot_key(secret, w), w * ttl
+
+def log_derived_slot(slot_key: str, created: int, ttl=SLOT_TTL):
+    # hmac mode has no rotation to log: the first call that sees a window logs its slot the way
+    # a rotation would, so recent_slot_keys() and the lecture report know it
+    e = _history.get(slot_key)
+    if e and e["created"] is not None: return
+    try:
+        with _slot_lock, file_lock(SLOT_FILE):
+            _history._refresh(force=True)  # another process may have logged it meanwhile
+            if (_history._ring.get(slot_key) or {}).get("created") is not None: return
+            prev = (_history._ring.get(_history._newest) or {}).get("created")
+            _log({"slot_key": slot_key, "created": created,
+                  "expired": created if prev is None else min(created, prev + ttl)})
+    except Exception:
+        pass
+
+def derived_keys(secret: str, ttl=SLOT_TTL, grace_windows=0, now=None):
+    # the current window's key followed by the `grace_windows` before it
+    w = slot_window(ttl, now)
+    return [hmac_slot_key(secret, w - i) for i in range(grace_windows + 1)]
+
+def check_derived_key(key: str, secret: str, ttl=SLOT_TTL, grace_windows=0, now=None):
+    return any(same_secret(key, k) for k in derived_keys(secret, ttl, grace_windows, now))
+
+# -------- Compact link tokens ----------
+# t = base64url(HMAC(QR_SECRET, slot_key)[:9]): 12 URL-safe characters replace
+# key=<32 hex>&s=<secret>, and the secret itself never appears in a link.
+def link_token(secret: str, slot_key: str):
+    mac = hmac.new(secret.encode("utf-8"), b"link:" + slot_key.encode("utf-8"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(mac[:9]).decode("ascii")
+
+def token_slot(token: str, secret: str, slot_keys):
+    # the slot key among `slot_keys` that `token` was issued for, or None
+    for k in slot_keys:
+        if same_secret(token, link_token(secret, k)): return k
+    return None
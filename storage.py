@@ -0,0 +1,1079 @@
+# storage.py - attendance log on disk (imported by core.py and the pages)
+# Lives in its own module so process-wide state (the group-commit writer)
+# survives Streamlit reruns, which re-execute each page from the top.
+from pathlib import Path
+from io import StringIO, BytesIO
+from collections import OrderedDict
+from contextlib import contextmanager
+import atexit, csv, importlib.util, json, os, queue, re, shutil, sqlite3, threading, time
+from datetime import datetime
+import pandas as pd
+try:
+    import fcntl
+except ImportError:  # no advisory locks (Windows): file_lock() does nothing
+    fcntl = None
+
+# -------- CONFIG ----------
+GROUP_COMMIT_WINDOW = 0.010  # seconds to wait for more rows before one write+fsync (5-20 ms is sensible)
+WRITE_QUEUE = True  # csv backend: hand rows to one background writer thread instead of writing on the script thread
+WRITE_QUEUE_SIZE = 2000  # rows that may wait for the writer; beyond that submissions are turned away (backpressure)
+WRITE_TIMEOUT = 10.0  # seconds a submitter waits for its row to be durable
+STORAGE_BACKEND = "csv"  # "csv" (data/attendance.csv), "sqlite" (data/attendance.db, WAL) or "sharded" (data/slots/<slot_key>.csv)
+CHUNK_ROWS = 50_000  # rows per DataFrame chunk when streaming the log (exports)
+OUT_OF_CORE = False  # True for logs too big for memory: per-slot reads, counts and duplicate checks stream CHUNK_ROWS at a time
+DUP_SLOTS_CACHED = 8  # out-of-core mode: slots whose cid sets are kept in memory (least recently used dropped)
+MANIFEST_FLUSH = 2.0  # sharded backend: seconds between manifest rewrites (it is reconciled with the shards on load)
+CSV_ENGINE = "c"  # pandas parser for loading the log: "c", or "pyarrow" (multithreaded; falls back to "c" if not installed)
+
+# -------- PATHS ----------
+DATA_DIR = Path("data"); DATA_DIR.mkdir(parents=True, exist_ok=True)
+CSV_PATH = DATA_DIR / "attendance.csv"
+ARCHIVE_DIR = DATA_DIR / "archive"; ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+OFFSETS_PATH = DATA_DIR / "attendance.csv.idx"
+SQLITE_PATH = DATA_DIR / "attendance.db"
+SHARD_DIR = DATA_DIR / "slots"
+MANIFEST_PATH = SHARD_DIR / "manifest.json"
+CSV_COLUMNS = ["timestamp","slot_key","name","email","cid"]
+CSV_DTYPES = {"timestamp": str, "slot_key": "category", "name": str, "email": str, "cid": "category"}  # timestamp parsed after
+DUPLICATE = "duplicate submission"  # error returned by append() when (slot_key, cid) already exists
+PENDING = "still saving"  # append() timed out waiting for the writer; the row is queued and may yet be written
+BUSY = "too many submissions at once, please try again"  # write queue full
+
+def parse_timestamps(df):
+    # "2024-01-01T09:00:00Z" strings -> tz-aware UTC datetime64, once, when the log is read.
+    # The exact-format fast path covers everything now_iso_utc writes; other ISO forms are
+    # retried individually and anything unparseable becomes NaT.
+    if "timestamp" not in df.columns or isinstance(df["timestamp"].dtype, pd.DatetimeTZDtype): return df
+    raw = df["timestamp"].astype(str)
+    ts = pd.to_datetime(raw.str.slice(0, 19), format="%Y-%m-%dT%H:%M:%S", errors="coerce")
+    odd = df["timestamp"].notna() & ~(raw.str.endswith("Z") & (raw.str.len() == 20))
+    if odd.any():
+        ts[odd] = pd.to_datetime(raw[odd], format="ISO8601", utc=True, errors="coerce").dt.tz_localize(None)
+    df["timestamp"] = ts.dt.tz_localize("UTC")
+    return df
+
+# -------- File locks ----------
+@contextmanager
+def file_lock(path, exclusive=True):
+    """Advisory flock on "<path>.lock": shared for readers, exclusive for writers.
+
+    Serialises writers across Streamlit server processes sharing data/ (and
+    across threads: every call opens its own descriptor). The lock lives on a
+    sidecar file because the data files themselves are moved and replaced.
+    """
+    if fcntl is None:
+        yield; return
+    with open(f"{path}.lock", "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+# -------- Typed loading ----------
+def csv_engine(engine=CSV_ENGINE):
+    return engine if engine != "pyarrow" or importlib.util.find_spec("pyarrow") else "c"
+
+def empty_df(columns=CSV_COLUMNS):
+    df = pd.DataFrame({c: pd.Series(dtype=CSV_DTYPES.get(c, str)) for c in columns})
+    return parse_timestamps(df)
+
+def concat_rows(a, b):
+    # pd.concat only keeps a categorical when both sides have the same categories,
+    # so extend a's (codes unchanged) and recode the new rows onto them
+    b = b.copy()
+    for c in a.columns:
+        if c in b.columns and isinstance(a[c].dtype, pd.CategoricalDtype) and isinstance(b[c].dtype, pd.CategoricalDtype):
+            new = b[c].cat.categories.difference(a[c].cat.categories)
+            if len(new): a = a.assign(**{c: a[c].cat.add_categories(new)})
+            b[c] = b[c].cat.set_categories(a[c].cat.categories)
+    return pd.concat([a, b], ignore_index=True)
+
+def load_csv(path=CSV_PATH, usecols=None, engine=CSV_ENGINE):
+    """The log as a typed DataFrame: slot_key/cid categorical, timestamp tz-aware UTC.
+
+    usecols limits parsing to those columns (e.g. ["slot_key", "cid"] for duplicate
+    checks). Malformed lines are skipped. A missing or empty file gives an empty
+    frame; nothing is written.
+    """
+    try:
+        with open(path, newline="", encoding="utf-8") as f: header = next(csv.reader(f), [])
+    except FileNotFoundError:
+        header = []
+    cols = [c for c in header if usecols is None or c in usecols]
+    if not cols: return empty_df([c for c in CSV_COLUMNS if usecols is None or c in usecols])
+    with file_lock(path, exclusive=False):
+        df = pd.read_csv(path, usecols=cols, dtype={c: CSV_DTYPES.get(c, str) for c in cols}, engine=csv_engine(engine),
+                         on_bad_lines="skip")
+    return parse_timestamps(df)
+
+def iter_csv_chunks(path=CSV_PATH, chunksize=CHUNK_ROWS, slot_key=None, columns=None):
+    # the log as string-typed DataFrames of at most chunksize rows, parsing only the columns
+    # needed; with slot_key, only that slot's rows (chunks without any are skipped). No lock is
+    # held across yields: archive/clear replace the file, so an open reader keeps its old copy.
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0: return
+    cols = None if columns is None else list(columns)
+    usecols = cols if cols is None or slot_key is None else list(dict.fromkeys(cols + ["slot_key"]))
+    with pd.read_csv(path, dtype=str, usecols=usecols, chunksize=chunksize, on_bad_lines="skip") as reader:
+        for chunk in reader:
+            if slot_key is not None:
+                chunk = chunk[chunk["slot_key"] == slot_key]
+                if chunk.empty: continue
+            if cols is not None: chunk = chunk[cols]
+            yield parse_timestamps(chunk)
+
+# -------- Group commit ----------
+class _Pending:
+    __slots__ = ("row", "done", "ok", "err", "queued")
+    def __init__(self, row):
+        self.row = row; self.done = threading.Event(); self.ok = False; self.err = ""; self.queued = time.monotonic()
+
+class GroupCommitWriter:
+    """Appends rows to a CSV, batching callers that arrive within `window` seconds.
+
+    The first caller of a batch becomes its leader: it waits `window` (only when other
+    submitters are in flight, so a lone submitter pays no delay), takes every row
+    queued meanwhile, writes them with a single write() and a single fsync, then
+    wakes the whole batch. append() only returns once the caller's row is durable.
+    on_commit, if given, receives [(slot_key, start, end)] byte spans of every
+    committed batch, in file order. Each batch is written under an exclusive
+    file_lock on `lock` (default: the file itself). on_write gets the same spans
+    while that lock is still held, for bookkeeping that must not be separated
+    from the write (it must not take the file lock itself).
+    """
+    def __init__(self, path: Path, fieldnames=CSV_COLUMNS, window=GROUP_COMMIT_WINDOW, on_commit=None, lock=None,
+                 on_write=None):
+        self.path = Path(path); self.fieldnames = list(fieldnames); self.window = window; self.on_commit = on_commit
+        self.on_write = on_write
+        self.lock_path = Path(lock) if lock else self.path
+        self._lock = threading.Lock()     # guards _pending, _leader and _active
+        self._io_lock = threading.Lock()  # one batch on disk at a time, in order
+        self._pending = []; self._leader = False; self._active = 0
+
+    def append(self, row: dict):
+        p = _Pending(row)
+        with self._lock:
+            self._pending.append(p); self._active += 1
+            lead = not self._leader
+            if lead: self._leader = True
+        if lead:
+            if self.window > 0 and self._active > 1: time.sleep(self.window)
+            with self._io_lock:
+                with self._lock:
+                    batch, self._pending = self._pending, []
+                    self._leader = False
+                self._commit(batch)
+        p.done.wait()
+        with self._lock: self._active -= 1
+        return p.ok, p.err
+
+    def _commit(self, batch):
+        buf = StringIO()
+        writer = csv.DictWriter(buf, fieldnames=self.fieldnames)
+        def take():
+            out = buf.getvalue().encode("utf-8"); buf.seek(0); buf.truncate(); return out
+        try:
+            rows = []
+            for p in batch: writer.writerow(p.row); rows.append(take())
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with file_lock(self.lock_path), open(self.path, "ab") as f:
+                if f.tell() == 0: writer.writeheader(); f.write(take())
+                pos = f.tell()
+                f.write(b"".join(rows)); f.flush(); os.fsync(f.fileno())
+                spans = []
+                for p, r in zip(batch, rows):
+                    spans.append((p.row.get("slot_key", ""), pos, pos + len(r))); pos += len(r)
+                if self.on_write is not None:
+                    try:
+                        self.on_write(spans)
+                    except Exception:
+                        pass  # the rows are durable; bookkeeping is reconciled from the file
+            ok, err = True, ""
+        except Exception as e:
+            ok, err = False, str(e)
+        if ok and self.on_commit is not None:
+            try:
+                self.on_commit(spans)
+            except Exception:
+                pass  # an index is rebuilt from the file; never fail a durable append over it
+        for p in batch:
+            p.ok, p.err = ok, err; p.done.set()
+
+class QueuedWriter(GroupCommitWriter):
+    """GroupCommitWriter whose file is owned by one background writer thread.
+
+    append() puts the row on a bounded queue and waits up to `timeout` for it to
+    be durable, so script threads never touch the file. The writer takes whatever
+    has queued up (at most max_batch rows) and commits it with one write and one
+    fsync: batches grow by themselves while a fsync is in flight, no window needed.
+    A full queue turns the submission away at once (BUSY). A timeout returns
+    PENDING: the row stays queued and is still written. drain() (run at exit)
+    stops intake and writes out what is queued.
+    """
+    def __init__(self, path: Path, fieldnames=CSV_COLUMNS, maxsize=WRITE_QUEUE_SIZE, timeout=WRITE_TIMEOUT,
+                 max_batch=500, on_commit=None, lock=None):
+        super().__init__(path, fieldnames, window=0, on_commit=on_commit, lock=lock)
+        self.timeout = timeout; self.max_batch = max_batch; self._q = queue.Queue(maxsize); self._closed = False
+        self._stats = {"written": 0, "batches": 0, "rejected": 0, "timeouts": 0, "max_depth": 0,
+                       "wait_total": 0.0, "wait_max": 0.0}
+        self._thread = threading.Thread(target=self._run, name="attendance-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.drain)
+
+    def append(self, row: dict):
+        p = _Pending(row)
+        if self._closed: return False, "shutting down"
+        try:
+            self._q.put_nowait(p)
+        except queue.Full:
+            with self._lock: self._stats["rejected"] += 1
+            return False, BUSY
+        with self._lock: self._stats["max_depth"] = max(self._stats["max_depth"], self._q.qsize())
+        if not p.done.wait(self.timeout):
+            with self._lock: self._stats["timeouts"] += 1
+            return False, PENDING
+        return p.ok, p.err
+
+    def _run(self):
+        stop = False
+        while not stop:
+            p = self._q.get()
+            if p is None: break
+            batch = [p]
+            while len(batch) < self.max_batch:
+                try:
+                    p = self._q.get_nowait()
+                except queue.Empty:
+                    break
+                if p is None: stop = True; break
+                batch.append(p)
+            with self._io_lock: self._commit(batch)
+            now = time.monotonic()
+            with self._lock:
+                st = self._stats; st["written"] += len(batch); st["batches"] += 1
+                for p in batch:
+                    waited = now - p.queued; st["wait_total"] += waited; st["wait_max"] = max(st["wait_max"], waited)
+
+    def drain(self, timeout=30.0):
+        # stop accepting rows, write everything already queued, stop the thread
+        if self._closed: return
+        self._closed = True
+        try:
+            self._q.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def metrics(self):
+        with self._lock: st = dict(self._stats)
+        st["depth"] = self._q.qsize()
+        st["wait_avg"] = st["wait_total"] / st["written"] if st["written"] else 0.0
+        del st["wait_total"]
+        return st
+
+# -------- Slot offset index ----------
+class OffsetIndex:
+    """Sidecar index of where each slot's rows sit in the CSV: slot_key -> [[start, end, rows], ...].
+
+    The writer reports the byte span of every committed row; each batch is
+    appended to the sidecar as "slot_key,start,end,rows" lines (consecutive rows
+    of a slot merged) and folded into memory. Slots are normally contiguous, but
+    grace-window submissions can interleave them, hence a list of ranges.
+    On first use, and whenever the CSV was replaced (another process archived or
+    cleared it: new device/inode), the sidecar is checked against the CSV: its
+    lines must cover the file from the header on without gaps. A gap, an overrun
+    or a shrunken file means it is stale and it is rebuilt by scanning the CSV;
+    rows found past its end are scanned and added in memory.
+    """
+    def __init__(self, path: Path = CSV_PATH, sidecar: Path = OFFSETS_PATH):
+        self.path = Path(path); self.sidecar = Path(sidecar); self._lock = threading.Lock()
+        self._slots = None; self._end = 0; self._header = b""; self._ident = None
+
+    def _put(self, key, start, end, rows):
+        ranges = self._slots.setdefault(key, [])
+        if ranges and ranges[-1][1] == start: ranges[-1][1] = end; ranges[-1][2] += rows
+        else: ranges.append([start, end, rows])
+        self._end = max(self._end, end)
+
+    def add(self, spans):
+        # GroupCommitWriter.on_commit: spans of one batch, in file order
+        runs = []
+        for key, start, end in spans:
+            if runs and runs[-1][0] == key and runs[-1][2] == start: runs[-1][2] = end; runs[-1][3] += 1
+            else: runs.append([key, start, end, 1])
+        if not runs: return
+        with self._lock:
+            try:
+                with open(self.sidecar, "a", newline="", encoding="utf-8") as f: csv.writer(f).writerows(runs)
+            except OSError:
+                pass
+            if self._slots is None: return
+            if runs[0][1] == self._end:
+                for r in runs: self._put(*r)
+            elif runs[-1][2] > self._end:
+                self._slots = None  # out of step: reload on next use
+
+    def reset(self):
+        # the CSV was archived or cleared
+        with self._lock:
+            try: self.sidecar.unlink()
+            except FileNotFoundError: pass
+            self._slots = None
+
+    def _scan(self, f, start, stop):
+        # runs of consecutive rows per slot between two line boundaries of the CSV
+        si = self._header.decode("utf-8").rstrip("\r\n").split(",").index("slot_key")
+        f.seek(start); pos = start; runs = []
+        for line in f:
+            if pos + len(line) > stop or not line.endswith(b"\n"): break
+            head = line.split(b",", si + 1)
+            key = head[si].decode("utf-8") if b'"' not in b"".join(head[:si + 1]) \
+                else next(csv.reader([line.decode("utf-8")]))[si]
+            if runs and runs[-1][0] == key: runs[-1][2] = pos + len(line); runs[-1][3] += 1
+            else: runs.append([key, pos, pos + len(line), 1])
+            pos += len(line)
+        return runs
+
+    def _ensure(self):
+        # caller holds _lock; loads, catches up or rebuilds so the index covers the file
+        try:
+            st = os.stat(self.path); size = st.st_size
+        except FileNotFoundError:
+            self._slots = {}; self._end = 0; self._header = b""; self._ident = None; return
+        if (st.st_dev, st.st_ino) != self._ident:
+            self._slots = None; self._ident = (st.st_dev, st.st_ino)  # replaced (archived/cleared elsewhere)
+        if self._slots is not None and self._end == size: return
+        with open(self.path, "rb") as f:
+            if self._slots is None or size < self._end:
+                self._header = f.readline()
+                if not self._header.endswith(b"\n"):
+                    self._slots = {}; self._end = 0; self._header = b""; return
+                self._slots = {}; self._end = len(self._header); stale = False
+                try:
+                    with open(self.sidecar, newline="", encoding="utf-8") as sf:
+                        for key, start, end, rows in csv.reader(sf):
+                            start, end, rows = int(start), int(end), int(rows)
+                            if end <= self._end: continue  # already covered (written during a rebuild)
+                            if start != self._end or end > size: stale = True; break
+                            self._put(key, start, end, rows)
+                except FileNotFoundError:
+                    stale = size > self._end
+                except (OSError, ValueError):
+                    stale = True
+                if stale:
+                    self._slots = {}; self._end = len(self._header)
+                    runs = self._scan(f, self._end, size)
+                    for r in runs: self._put(*r)
+                    tmp = self.sidecar.with_suffix(".tmp")
+                    with open(tmp, "w", newline="", encoding="utf-8") as sf: csv.writer(sf).writerows(runs)
+                    os.replace(tmp, self.sidecar)
+                    return
+            for r in self._scan(f, self._end, size): self._put(*r)
+
+    def ranges(self, slot_key):
+        with self._lock:
+            self._ensure()
+            return [tuple(r) for r in self._slots.get(slot_key, [])]
+
+    def slot_column(self, slot_key, column, since=0):
+        # (file identity, end of the slot's last range, values of `column` in the slot's rows past
+        # byte offset `since`), parsed with the csv module: for the few rows added since a check
+        with self._lock:
+            self._ensure()
+            ranges = [(max(s, since), e) for s, e, _ in self._slots.get(slot_key, []) if e > since]
+            ident, header = self._ident, self._header
+            end = ranges[-1][1] if ranges else since
+        have = header.decode("utf-8").rstrip("\r\n").split(",")
+        if not ranges or column not in have: return ident, end, []
+        i = have.index(column)
+        with file_lock(self.path, exclusive=False), open(self.path, "rb") as f:
+            parts = []
+            for start, stop in ranges: f.seek(start); parts.append(f.read(stop - start))
+        return ident, end, [r[i] for r in csv.reader(b"".join(parts).decode("utf-8").splitlines()) if len(r) > i]
+
+    def counts(self):
+        # rows per slot in order of first appearance, from the ranges alone (no row parsing)
+        with self._lock:
+            self._ensure()
+            return {k: sum(r[2] for r in v) for k, v in self._slots.items()}
+
+    def read_slot(self, slot_key, columns=None, dtype=None):
+        # one slot's rows, typed like load_csv (or all dtype), reading only its byte ranges
+        with self._lock:
+            self._ensure()
+            ranges = list(self._slots.get(slot_key, [])); header = self._header
+        have = header.decode("utf-8").rstrip("\r\n").split(",")
+        cols = [c for c in (columns or CSV_COLUMNS) if c in have]
+        if not ranges or not cols: return empty_df(cols or list(columns or CSV_COLUMNS))
+        with file_lock(self.path, exclusive=False), open(self.path, "rb") as f:
+            parts = [header]
+            for start, end, _ in ranges: f.seek(start); parts.append(f.read(end - start))
+        df = pd.read_csv(BytesIO(b"".join(parts)), usecols=cols, dtype=dtype or {c: CSV_DTYPES.get(c, str) for c in cols})
+        return parse_timestamps(df)
+
+_offsets = OffsetIndex(CSV_PATH)
+_writer = (QueuedWriter if WRITE_QUEUE else GroupCommitWriter)(CSV_PATH, on_commit=_offsets.add)
+
+# -------- Incremental reader ----------
+class TailReader:
+    """Keeps the parsed CSV in memory and parses only the bytes appended since the last read.
+
+    Remembers the byte offset and row count it has consumed together with the
+    file's inode, size and mtime. A different inode, a shrunken file, a rewrite of
+    the same size, or changed bytes just before the offset (clear/archive followed
+    by new appends) trigger a full reload. Only complete lines are consumed. The
+    returned DataFrame is shared between callers: treat it as read-only.
+    """
+    GUARD = 64  # bytes before the offset re-checked on every incremental read
+
+    def __init__(self, path: Path, columns=CSV_COLUMNS):
+        self.path = Path(path); self.columns = list(columns); self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.ident = None; self.size = -1; self.mtime_ns = 0
+        self.offset = 0; self.rows = 0; self._guard = b""; self._header = None
+        self._df = empty_df(self.columns)
+
+    def read(self):
+        with self._lock, file_lock(self.path, exclusive=False):
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                self._reset(); return self._df
+            if (st.st_dev, st.st_ino) == self.ident and st.st_size == self.size and st.st_mtime_ns == self.mtime_ns:
+                return self._df
+            with open(self.path, "rb") as f:
+                if (st.st_dev, st.st_ino) != self.ident or st.st_size < self.offset or st.st_size == self.size \
+                        or not self._guard_ok(f):
+                    self._reset(); self.ident = (st.st_dev, st.st_ino)
+                f.seek(self.offset); data = f.read(st.st_size - self.offset)
+            self.size = st.st_size; self.mtime_ns = st.st_mtime_ns
+            end = data.rfind(b"\n") + 1
+            if end: self._consume(data[:end])
+            return self._df
+
+    def _guard_ok(self, f):
+        if not self._guard: return True
+        f.seek(self.offset - len(self._guard))
+        return f.read(len(self._guard)) == self._guard
+
+    def _consume(self, data: bytes):
+        if self._header is None:
+            nl = data.index(b"\n") + 1
+            self._header = data[:nl]; body = data[nl:]
+        else:
+            body = data
+        if body or self.rows == 0:
+            new = parse_timestamps(pd.read_csv(BytesIO(self._header + body), dtype=CSV_DTYPES, engine=csv_engine()))
+            self._df = new if self.rows == 0 else concat_rows(self._df, new)
+            self.rows += len(new)
+        self.offset += len(data)
+        self._guard = data[-self.GUARD:] if len(data) >= self.GUARD else (self._guard + data)[-self.GUARD:]
+
+_tail = TailReader(CSV_PATH)
+
+# -------- CSV helpers ----------
+def safe_append_csv(row: dict):
+    return _writer.append(row)
+
+def writer_metrics():
+    # write-queue backpressure: depth, max_depth, wait_avg/wait_max (s), rejected, timeouts, written, batches
+    return _writer.metrics() if isinstance(_writer, QueuedWriter) else None
+
+def read_df():
+    # typed like load_csv; a missing log reads as empty without creating the file
+    try:
+        return _tail.read()
+    except Exception:
+        return empty_df()
+
+def _fresh_csv():
+    # replace the log with a header-only file in one rename; readers holding the old file keep it intact
+    tmp = CSV_PATH.with_suffix(".tmp")
+    pd.DataFrame(columns=CSV_COLUMNS).to_csv(tmp, index=False)
+    os.replace(tmp, CSV_PATH)
+
+def archive_path():
+    # data/archive/attendance_archive_<ts>.csv; _2, _3, ... when archived again within the same second
+    ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    dest = ARCHIVE_DIR / f"attendance_archive_{ts}.csv"; n = 1
+    while dest.exists():
+        n += 1; dest = ARCHIVE_DIR / f"attendance_archive_{ts}_{n}.csv"
+    return dest
+
+def archive_records(dropped=None):
+    # dropped (a dict) receives the rows per slot that were moved
+    try:
+        with file_lock(CSV_PATH):  # no process is mid-append while the file moves
+            if dropped is not None: dropped.update(_offsets.counts())
+            dest = archive_path()
+            if CSV_PATH.exists(): shutil.move(str(CSV_PATH), str(dest))
+            _fresh_csv()
+        _offsets.reset()
+        return True, str(dest)
+    except Exception as e:
+        return False, str(e)
+
+def clear_records(dropped=None):
+    try:
+        with file_lock(CSV_PATH):
+            if dropped is not None: dropped.update(_offsets.counts())
+            _fresh_csv()
+        _offsets.reset()
+        return True, ""
+    except Exception as e:
+        return False, str(e)
+
+# -------- Duplicate index ----------
+class DupIndex:
+    """Process-wide set of (slot_key, cid) pairs present in a CSV; membership is O(1).
+
+    Built once from a two-column typed load of the file, then kept in step by
+    the writer (reserve before the append, discard if it fails). Every check
+    stats the file and parses the rows appended since (by any process); a
+    replaced or shrunk file (archived or cleared) is read again from its
+    header. `lock` is the path the file's writers lock (default: the file).
+    Rows without a cid are never indexed.
+    """
+    def __init__(self, path: Path, lock: Path = None):
+        self.path = Path(path); self.lock_path = Path(lock) if lock else self.path
+        self._lock = threading.Lock(); self._keys = set(); self._ident = None; self._end = 0; self._cols = None
+        self.rebuild()
+
+    def _reopen(self, st):
+        # caller holds _lock; a new file: no keys yet, rows start after the header
+        self._ident = (st.st_dev, st.st_ino); self._keys = set(); self._end = 0; self._cols = None
+        with open(self.path, "rb") as f: line = f.readline()
+        if not line.endswith(b"\n"): return
+        header = next(csv.reader([line.decode("utf-8")]))
+        if {"slot_key", "cid"} <= set(header): self._cols = (header.index("slot_key"), header.index("cid"))
+        self._end = len(line)
+
+    def rebuild(self):
+        # under the writers' lock, so the bytes covered end on a row boundary
+        with self._lock, file_lock(self.lock_path, exclusive=False):
+            try:
+                st = os.stat(self.path); self._reopen(st)
+                df = load_csv(self.path, usecols=["slot_key", "cid"]).dropna(subset=["cid"]).drop_duplicates()
+                self._keys = set(zip(df["slot_key"].astype(object), df["cid"].astype(object))); self._end = st.st_size
+            except (OSError, ValueError, KeyError):
+                pass  # missing or unreadable: _catch_up starts from the header
+
+    def _catch_up(self):
+        # caller holds _lock
+        try:
+            st = os.stat(self.path)
+            if (st.st_dev, st.st_ino) != self._ident or st.st_size < self._end: self._reopen(st)
+            if st.st_size == self._end: return
+            with open(self.path, "rb") as f:
+                f.seek(self._end); data = f.read(st.st_size - self._end)
+        except OSError:  # gone (a shard archived elsewhere): nothing left to be a duplicate of
+            self._keys = set(); self._ident = None; self._end = 0
+            return
+        data = data[:data.rfind(b"\n") + 1]  # complete rows only
+        if self._cols:
+            si, ci = self._cols
+            for r in csv.reader(data.decode("utf-8").splitlines()):
+                if len(r) > max(si, ci) and r[ci]: self._keys.add((r[si], r[ci]))
+        self._end += len(data)
+
+    def __contains__(self, key):
+        with self._lock:
+            self._catch_up()
+            return key in self._keys
+
+    def reserve(self, key) -> bool:
+        # atomic check-and-add so two racing submissions cannot both pass
+        with self._lock:
+            self._catch_up()
+            if key in self._keys: return False
+            self._keys.add(key); return True
+
+    def discard(self, key):
+        with self._lock: self._keys.discard(key)
+
+    def reset(self):
+        # the file was archived or cleared: read again from its header on next use
+        with self._lock: self._keys = set(); self._ident = None; self._end = 0
+
+class SlotDupIndex:
+    """Out-of-core duplicate index: cid sets only for the slots being submitted to.
+
+    A slot's set is loaded on first use, from the slot's byte ranges when given an
+    OffsetIndex, else by streaming slot_key/cid through the log in CHUNK_ROWS
+    chunks; beyond max_slots the least recently used slot is dropped. With an
+    OffsetIndex, rows of the slot appended since (by any process) are read in
+    on each check.
+    Memory follows the few live slots instead of the whole log. Same interface as
+    DupIndex, keys are (slot_key, cid).
+    """
+    def __init__(self, path: Path, max_slots=DUP_SLOTS_CACHED, chunksize=CHUNK_ROWS, offsets=None):
+        self.path = Path(path); self.max_slots = max_slots; self.chunksize = chunksize; self.offsets = offsets
+        self._lock = threading.Lock(); self._slots = OrderedDict()
+
+    def _cids(self, slot_key):
+        # caller holds _lock, so a slot is scanned once even when its first submitters race.
+        # _slots maps slot_key -> [cids, file identity, byte offset the cids are read up to]
+        entry = self._slots.get(slot_key)
+        if entry is None:
+            if self.offsets is not None:
+                entry = [set(), None, 0]  # read below, from the slot's byte ranges
+            else:
+                entry = [set(), None, None]
+                for chunk in iter_csv_chunks(self.path, self.chunksize, slot_key, ["cid"]):
+                    entry[0].update(chunk["cid"].dropna())
+            self._slots[slot_key] = entry
+            while len(self._slots) > self.max_slots: self._slots.popitem(last=False)
+        else:
+            self._slots.move_to_end(slot_key)
+        if self.offsets is not None:
+            ident, end, cids = self.offsets.slot_column(slot_key, "cid", entry[2])
+            if ident != entry[1]:  # first use, or the log was replaced (archived or cleared elsewhere)
+                if entry[2]: ident, end, cids = self.offsets.slot_column(slot_key, "cid")
+                entry[0].clear(); entry[1] = ident
+            entry[0].update(c for c in cids if c); entry[2] = end
+        return entry[0]
+
+    def rebuild(self):
+        with self._lock: self._slots.clear()
+
+    def __contains__(self, key):
+        with self._lock: return key[1] in self._cids(key[0])
+
+    def reserve(self, key) -> bool:
+        with self._lock:
+            cids = self._cids(key[0])
+            if key[1] in cids: return False
+            cids.add(key[1]); return True
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._slots.get(key[0])
+            if entry is not None: entry[0].discard(key[1])
+
+    reset = rebuild
+
+# -------- Storage backends ----------
+def file_sig(path: Path):
+    # (inode, size, mtime_ns), or None if the file is missing; changes whenever the file does
+    try:
+        st = os.stat(path)
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+    except OSError:
+        return None
+
+class Storage:
+    """Interface the app talks to. append/archive/clear return (ok, info) like the CSV helpers."""
+    def append(self, row: dict): raise NotImplementedError
+    def has_submission(self, slot_key: str, cid: str) -> bool: raise NotImplementedError
+    def read_df(self, slot_key: str = None): raise NotImplementedError
+    def iter_chunks(self, chunksize: int = CHUNK_ROWS, slot_key: str = None, columns=None):
+        raise NotImplementedError  # DataFrames of CSV_COLUMNS (or columns), optionally one slot's rows
+    def version(self): raise NotImplementedError  # changes whenever the stored rows may have changed
+    def archive(self): raise NotImplementedError
+    def clear(self): raise NotImplementedError
+
+    def counts(self):
+        # rows per slot_key (in order of first appearance), streamed chunk by chunk
+        total = {}
+        for chunk in self.iter_chunks(columns=["slot_key"]):
+            for k, n in chunk["slot_key"].value_counts(sort=False).items(): total[k] = total.get(k, 0) + int(n)
+        return pd.Series(total, dtype="int64", name="rows")
+
+    # live headcounts: rows per slot_key in memory, seeded from counts() and then moved by this
+    # process's own appends. The version() seen after the last seed or own append is kept; any
+    # other change (another process's append, archive or clear) makes the next call reseed.
+    # An own append only moves the counters if they were last set at the version it started
+    # from: a seed taken after its row reached the file already counts it.
+    _headcounts = None
+    _headcount_version = None
+    _headcount_lock = threading.Lock()
+
+    def headcounts(self, slot_keys):
+        v = self.version()  # read before counts(), so a write during the seed causes another one
+        with self._headcount_lock:
+            if self._headcounts is None or v != self._headcount_version:
+                self._headcounts = {k: int(n) for k, n in self.counts().items()}; self._headcount_version = v
+            return {k: self._headcounts.get(k, 0) for k in slot_keys}
+
+    def _counted(self, slot_key, res, before):
+        # append result passed through; a written (or still queued) row counts. before is the
+        # version() read before the append started
+        ok, err = res
+        if ok or err == PENDING:
+            with self._headcount_lock:
+                if self._headcounts is None: pass
+                elif self._headcount_version != before: self._headcounts = None  # reseeded meanwhile, or raced
+                else:
+                    self._headcounts[slot_key] = self._headcounts.get(slot_key, 0) + 1
+                    self._headcount_version = self.version()
+        return res
+
+    # set by the app: called with {slot_key: rows} an archive/clear removed, counted under the
+    # lock that moved or deleted them, and only once the operation succeeded
+    on_drop = None
+
+    def _uncounted(self, res, dropped=None):
+        # archive/clear result passed through; reseed on next use
+        if res[0]:
+            with self._headcount_lock: self._headcounts = None
+            if dropped and self.on_drop: self.on_drop(dropped)
+        return res
+
+class CsvStorage(Storage):
+    def __init__(self):
+        self.index = SlotDupIndex(CSV_PATH, offsets=_offsets) if OUT_OF_CORE else DupIndex(CSV_PATH)
+
+    def append(self, row: dict):
+        key = (row.get("slot_key",""), row.get("cid") or "")
+        if key[1] and not self.index.reserve(key): return False, DUPLICATE
+        before = self.version()
+        ok, err = safe_append_csv(row)
+        if not ok and key[1] and err != PENDING: self.index.discard(key)  # a PENDING row is still written
+        return self._counted(key[0], (ok, err), before)
+
+    def has_submission(self, slot_key, cid):
+        return bool(cid) and (slot_key, cid) in self.index
+
+    def read_df(self, slot_key=None):
+        if OUT_OF_CORE and slot_key is not None:
+            return _offsets.read_slot(slot_key)
+        df = read_df()  # whole log in memory
+        if slot_key is not None and "slot_key" in df.columns:
+            df = df[df["slot_key"] == slot_key]
+        return df
+
+    def version(self):
+        return file_sig(CSV_PATH)
+
+    def counts(self):
+        return pd.Series(_offsets.counts(), dtype="int64", name="rows")
+
+    def iter_chunks(self, chunksize=CHUNK_ROWS, slot_key=None, columns=None):
+        if slot_key is None: return iter_csv_chunks(CSV_PATH, chunksize, None, columns)
+        df = _offsets.read_slot(slot_key, columns, dtype=str)  # one slot is small: a single chunk
+        return iter([df] if len(df) else [])
+
+    def archive(self):
+        dropped = {}; ok, info = archive_records(dropped)
+        if ok: self.index.reset()
+        return self._uncounted((ok, info), dropped)
+
+    def clear(self):
+        dropped = {}; ok, info = clear_records(dropped)
+        if ok: self.index.reset()
+        return self._uncounted((ok, info), dropped)
+
+class SqliteStorage(Storage):
+    """attendance table in WAL mode; UNIQUE(slot_key, cid) makes the duplicate check an index probe.
+
+    Rows without a cid are stored with cid NULL so they never collide. On first
+    creation the existing attendance.csv (if any) is imported once.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS attendance (
+            id INTEGER PRIMARY KEY, timestamp TEXT NOT NULL, slot_key TEXT NOT NULL,
+            name TEXT, email TEXT, cid TEXT);
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_attendance_slot_cid ON attendance(slot_key, cid);
+        CREATE INDEX IF NOT EXISTS ix_attendance_timestamp ON attendance(timestamp);
+        CREATE INDEX IF NOT EXISTS ix_attendance_email ON attendance(email);
+    """
+    def __init__(self, path: Path = SQLITE_PATH, import_csv: Path = CSV_PATH):
+        self.path = Path(path); self._local = threading.local(); self._writes = 0
+        con = self._con()
+        if con.execute("PRAGMA user_version").fetchone()[0] == 0:
+            with con:
+                con.executescript(self.SCHEMA)
+                if import_csv and Path(import_csv).exists():
+                    with open(import_csv, newline="", encoding="utf-8") as f:
+                        con.executemany(
+                            "INSERT OR IGNORE INTO attendance (timestamp, slot_key, name, email, cid) VALUES (?,?,?,?,?)",
+                            ((r.get("timestamp",""), r.get("slot_key",""), r.get("name",""), r.get("email",""), r.get("cid") or None)
+                             for r in csv.DictReader(f)))
+                con.execute("PRAGMA user_version = 1")
+
+    def _con(self):
+        # one connection per thread; Streamlit runs each session's script in its own thread
+        con = getattr(self._local, "con", None)
+        if con is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            con = sqlite3.connect(self.path, timeout=30)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=FULL")  # a commit is durable before append() returns
+            self._local.con = con
+        return con
+
+    def append(self, row: dict):
+        before = self.version()
+        try:
+            with self._con() as con:
+                con.execute("INSERT INTO attendance (timestamp, slot_key, name, email, cid) VALUES (?,?,?,?,?)",
+                            (row.get("timestamp",""), row.get("slot_key",""), row.get("name",""), row.get("email",""), row.get("cid") or None))
+            self._writes += 1
+            return self._counted(row.get("slot_key",""), (True, ""), before)
+        except sqlite3.IntegrityError:
+            return False, DUPLICATE
+        except Exception as e:
+            return False, str(e)
+
+    def has_submission(self, slot_key, cid):
+        if not cid: return False
+        try:
+            return self._con().execute("SELECT 1 FROM attendance WHERE slot_key=? AND cid=? LIMIT 1", (slot_key, cid)).fetchone() is not None
+        except Exception:
+            return False
+
+    def read_df(self, slot_key=None):
+        q = "SELECT timestamp, slot_key, name, email, cid FROM attendance"
+        args = ()
+        if slot_key is not None: q += " WHERE slot_key=?"; args = (slot_key,)
+        try:
+            df = pd.read_sql_query(q + " ORDER BY id", self._con(), params=args)
+            return parse_timestamps(df.astype({"slot_key": "category", "cid": "category"}))
+        except Exception:
+            return empty_df()
+
+    def version(self):
+        # this process's write counter, plus the db and WAL file stats for writes made by other processes
+        return (self._writes, file_sig(self.path), file_sig(Path(str(self.path) + "-wal")))
+
+    def iter_chunks(self, chunksize=CHUNK_ROWS, slot_key=None, columns=None):
+        cols = [c for c in (columns or CSV_COLUMNS) if c in CSV_COLUMNS]
+        q = f"SELECT {', '.join(cols)} FROM attendance"; args = ()
+        if slot_key is not None: q += " WHERE slot_key=?"; args = (slot_key,)
+        for chunk in pd.read_sql_query(q + " ORDER BY id", self._con(), params=args, chunksize=chunksize):
+            yield parse_timestamps(chunk)
+
+    def counts(self):
+        q = "SELECT slot_key, COUNT(*) FROM attendance GROUP BY slot_key ORDER BY MIN(id)"
+        return pd.Series(dict(self._con().execute(q).fetchall()), dtype="int64", name="rows")
+
+    def archive(self):
+        # same artifact as the CSV backend: data/archive/attendance_archive_<ts>.csv
+        # BEGIN IMMEDIATE takes the write lock before the export, so no row can be committed
+        # between the SELECT and the DELETE (appends wait, up to the connection timeout)
+        dest = archive_path()
+        try:
+            con = self._con()
+            con.execute("BEGIN IMMEDIATE")
+            with con:
+                dropped = dict(con.execute("SELECT slot_key, COUNT(*) FROM attendance GROUP BY slot_key").fetchall())
+                cur = con.execute("SELECT timestamp, slot_key, name, email, cid FROM attendance ORDER BY id")
+                with open(dest, "w", newline="", encoding="utf-8") as f:
+                    w = csv.writer(f); w.writerow(CSV_COLUMNS)
+                    for r in cur: w.writerow(["" if v is None else v for v in r])
+                    f.flush(); os.fsync(f.fileno())
+                con.execute("DELETE FROM attendance")
+            self._writes += 1
+            return self._uncounted((True, str(dest)), dropped)
+        except Exception as e:
+            return False, str(e)
+
+    def clear(self):
+        try:
+            con = self._con()
+            con.execute("BEGIN IMMEDIATE")
+            with con:
+                dropped = dict(con.execute("SELECT slot_key, COUNT(*) FROM attendance GROUP BY slot_key").fetchall())
+                con.execute("DELETE FROM attendance")
+            self._writes += 1
+            return self._uncounted((True, ""), dropped)
+        except Exception as e:
+            return False, str(e)
+
+class ShardedStorage(Storage):
+    """One CSV per slot, data/slots/<slot_key>.csv, plus data/slots/manifest.json.
+
+    The manifest maps slot_key -> {created, rows, bytes}. It is kept in memory,
+    rewritten at most every MANIFEST_FLUSH seconds (and whenever a shard is
+    created), and reconciled with the shards under the shards lock: before each
+    rewrite and before whole-log reads, so shards other processes appended to
+    are picked up. An entry is kept when its bytes match the shard's size (from
+    memory or manifest.json), other shards are recounted.
+    Duplicate checks and per-slot reads touch one shard; whole-log reads go shard
+    by shard in creation order. On first use an existing attendance.csv is split
+    into shards once.
+    """
+    KEY_RE = re.compile(r"[A-Za-z0-9_-]{1,128}")  # slot keys are used as file names
+
+    def __init__(self, root: Path = SHARD_DIR, import_csv: Path = CSV_PATH):
+        self.root = Path(root); self.manifest_path = self.root / "manifest.json"; self.lock_path = self.root / "shards"
+        self._lock = threading.Lock(); self._writers = {}; self._indexes = OrderedDict()
+        self._writes = 0; self._flushed = 0.0
+        fresh = not self.root.exists(); seed = {}
+        self.root.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.lock_path), self._lock:  # another process may be starting or appending
+            if fresh and import_csv and Path(import_csv).exists():
+                for chunk in iter_csv_chunks(import_csv):
+                    for key, part in chunk.groupby("slot_key", sort=False):
+                        if not self.KEY_RE.fullmatch(key): continue
+                        if key not in seed:  # first row of the slot dates the shard
+                            first = part["timestamp"].iloc[0]
+                            seed[key] = {"created": "" if pd.isna(first) else first.strftime("%Y-%m-%dT%H:%M:%SZ")}
+                        part.to_csv(self.shard(key), mode="a", header=not self.shard(key).exists(), index=False,
+                                    columns=CSV_COLUMNS, date_format="%Y-%m-%dT%H:%M:%SZ")
+            self.manifest = seed
+            self._flush(force=True)
+        atexit.register(self._flush_at_exit)  # counts of the last MANIFEST_FLUSH seconds
+
+    def shard(self, slot_key) -> Path:
+        return self.root / f"{slot_key}.csv"
+
+    def _load_manifest(self, known):
+        # one entry per shard on disk: the entry from `known` or manifest.json whose bytes match
+        # the shard's size, else a recount
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f: disk = json.load(f)
+        except Exception:
+            disk = {}
+        manifest = {}
+        for p in self.root.glob("*.csv"):
+            st = p.stat(); seen = [d[p.stem] for d in (known, disk) if p.stem in d]
+            m = next((m for m in seen if m.get("bytes") == st.st_size), None)
+            if m is None:
+                with open(p, "rb") as f: lines = sum(b.count(b"\n") for b in iter(lambda: f.read(1 << 20), b""))
+                created = next((m["created"] for m in seen if m.get("created")), None) \
+                    or datetime.utcfromtimestamp(st.st_mtime).isoformat(timespec="seconds") + "Z"
+                m = {"created": created, "rows": max(lines - 1, 0), "bytes": st.st_size}
+            manifest[p.stem] = m
+        return dict(sorted(manifest.items(), key=lambda kv: kv[1]["created"]))
+
+    def _sync(self):
+        # caller holds file_lock(self.lock_path) and _lock: take in shards other processes wrote
+        manifest = self._load_manifest(self.manifest)
+        if manifest != self.manifest: self.manifest = manifest; self._writes += 1
+
+    def _refresh(self):
+        with file_lock(self.lock_path, exclusive=False), self._lock: self._sync()
+
+    def _flush(self, force=False):
+        # caller holds file_lock(self.lock_path) and _lock; reconciled first, so one process's
+        # rewrite never replaces another's entries with older ones
+        if not force and time.time() - self._flushed < MANIFEST_FLUSH: return
+        self._sync()
+        tmp = self.manifest_path.with_suffix(".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f: json.dump(self.manifest, f)
+            os.replace(tmp, self.manifest_path); self._flushed = time.time()
+        except Exception:
+            pass
+
+    def _index(self, slot_key):
+        # duplicate index for one shard, built on first use; a few recent slots stay loaded
+        with self._lock:
+            idx = self._indexes.get(slot_key)
+            if idx is not None:
+                self._indexes.move_to_end(slot_key); return idx
+        idx = DupIndex(self.shard(slot_key), lock=self.lock_path)  # outside _lock: it waits for the shards lock
+        with self._lock:
+            idx = self._indexes.setdefault(slot_key, idx)  # the first of two racing builds wins
+            while len(self._indexes) > DUP_SLOTS_CACHED: self._indexes.popitem(last=False)
+            return idx
+
+    def append(self, row: dict):
+        key = row.get("slot_key", ""); cid = row.get("cid") or ""
+        if not self.KEY_RE.fullmatch(key): return False, "invalid slot key"
+        idx = self._index(key)
+        if cid and not idx.reserve((key, cid)): return False, DUPLICATE
+        with self._lock:
+            w = self._writers.get(key)
+            if w is None:
+                w = self._writers[key] = GroupCommitWriter(self.shard(key), lock=self.lock_path,
+                                                           on_write=lambda spans, k=key: self._written(k, spans))
+        before = self.version()
+        ok, err = w.append(row)
+        if not ok:
+            if cid: idx.discard((key, cid))
+            return ok, err
+        return self._counted(key, (True, ""), before)
+
+    def _written(self, key, spans):
+        # GroupCommitWriter.on_write, under the shards lock: the manifest moves with the shard, so an
+        # archive (which holds the same lock) never sees rows the manifest does not know about
+        with self._lock:
+            m = self.manifest.get(key)
+            if m is not None and m["bytes"] == spans[0][1]:
+                m["rows"] += len(spans); m["bytes"] = spans[-1][2]; self._writes += 1
+                self._flush()
+            else:  # a new shard, or one another process appended to: recounted, these rows included
+                self._flush(force=True)
+
+    def _flush_at_exit(self):
+        try:
+            with file_lock(self.lock_path), self._lock: self._flush(force=True)
+        except Exception:
+            pass
+
+    def has_submission(self, slot_key, cid):
+        return bool(cid) and self.KEY_RE.fullmatch(slot_key or "") is not None and (slot_key, cid) in self._index(slot_key)
+
+    def read_df(self, slot_key=None):
+        if slot_key is not None:
+            return load_csv(self.shard(slot_key)) if self.KEY_RE.fullmatch(slot_key) else empty_df()
+        self._refresh()
+        parts = [load_csv(self.shard(k)) for k in list(self.manifest)]
+        if not parts: return empty_df()
+        return pd.concat(parts, ignore_index=True).astype({"slot_key": "category", "cid": "category"})
+
+    def iter_chunks(self, chunksize=CHUNK_ROWS, slot_key=None, columns=None):
+        if slot_key is None: self._refresh()
+        keys = list(self.manifest) if slot_key is None else [slot_key] if slot_key in self.manifest else []
+        for k in keys: yield from iter_csv_chunks(self.shard(k), chunksize, None, columns)
+
+    def counts(self):
+        with file_lock(self.lock_path, exclusive=False), self._lock:
+            self._sync()
+            return pd.Series({k: m["rows"] for k, m in self.manifest.items()}, dtype="int64", name="rows")
+
+    def version(self):
+        return (self._writes, file_sig(self.manifest_path))
+
+    def _drop_shards(self):
+        # caller holds file_lock(self.lock_path) and _lock; returns the rows per slot removed
+        self._sync()
+        dropped = {k: m["rows"] for k, m in self.manifest.items()}
+        for p in self.root.glob("*.csv"): p.unlink()
+        self.manifest = {}; self._indexes.clear(); self._writes += 1
+        self._flush(force=True)
+        return dropped
+
+    def archive(self):
+        # same artifact as the other backends: one data/archive/attendance_archive_<ts>.csv.
+        # The shards lock (which every shard writer takes) is held across the copy and the
+        # unlink, so no row can be acknowledged in between and then deleted.
+        dest = archive_path()
+        try:
+            with file_lock(self.lock_path), self._lock:
+                with open(dest, "wb") as out:
+                    out.write((",".join(CSV_COLUMNS) + "\n").encode("utf-8"))
+                    for p in sorted(self.root.glob("*.csv"), key=lambda p: self.manifest.get(p.stem, {}).get("created", "")):
+                        with open(p, "rb") as f:
+                            f.readline(); shutil.copyfileobj(f, out)
+                    out.flush(); os.fsync(out.fileno())
+                dropped = self._drop_shards()
+            return self._uncounted((True, str(dest)), dropped)
+        except Exception as e:
+            return False, str(e)
+
+    def clear(self):
+        try:
+            with file_lock(self.lock_path), self._lock:
+                dropped = self._drop_shards()
+            return self._uncounted((True, ""), dropped)
+        except Exception as e:
+            return False, str(e)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_storage(backend: str = STORAGE_BACKEND) -> Storage:
+    # process-wide singleton per backend
+    with _stores_lock:
+        if backend not in _stores:
+            if backend == "csv": _stores[backend] = CsvStorage()
+            elif backend == "sqlite": _stores[backend] = SqliteStorage()
+            elif backend == "sharded": _stores[backend] = ShardedStorage()
+            else: raise ValueError(f"unknown storage backend: {backend}")
+        return _stores[backend]